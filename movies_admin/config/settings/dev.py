@@ -2,3 +2,12 @@ from .base import *
 
 DEBUG = True
 INTERNAL_IPS.append("127.0.0.1")
+
+# DebugToolbarMiddleware только синхронный: под ним async-представления
+# выполнялись бы по одному в общем потоке, поэтому с ASYNC_API он не подключается
+if not ASYNC_API:
+    INSTALLED_APPS.append("debug_toolbar")
+    MIDDLEWARE.insert(
+        MIDDLEWARE.index("django.middleware.common.CommonMiddleware") + 1,
+        "debug_toolbar.middleware.DebugToolbarMiddleware",
+    )
@@ -1,4 +1,3 @@
-import debug_toolbar
 from django.conf import settings
 from django.contrib import admin
 from django.urls import include, path
@@ -9,5 +8,7 @@ urlpatterns = [
 
 ]
 
-if bool(settings.DEBUG):
+if "debug_toolbar" in settings.INSTALLED_APPS:
+    import debug_toolbar
+
     urlpatterns.append(path("__debug__/", include(debug_toolbar.urls)))
@@ -0,0 +1,146 @@
+"""Асинхронные версии MoviesListApi и MoviesDetailApi для запуска под ASGI.
+
+Ответы совпадают с синхронными представлениями, документы читаются из
+film_work_document через пул asyncpg, поэтому запрос не занимает поток
+на время обращения к базе."""
+import math
+from functools import wraps
+
+from asgiref.sync import sync_to_async
+from django.http import (Http404, HttpResponse, HttpResponseBadRequest,
+                         HttpResponseNotAllowed, JsonResponse)
+
+from movies.api.v1.views import (API_FIELDS, InvalidParameter, MoviesListApi,
+                                 decode_cursor, encode_cursor, parse_fields,
+                                 parse_ids, serialize_document)
+from movies.async_db import fetch, fetchval
+from movies.cache import get_detail_key, get_list_key, get_response, set_response
+
+# обращения к кэшу не используют ORM, поэтому не занимают общий поток
+# sync_to_async и выполняются параллельно
+aget_response = sync_to_async(get_response, thread_sensitive=False)
+aset_response = sync_to_async(set_response, thread_sensitive=False)
+aget_list_key = sync_to_async(get_list_key, thread_sensitive=False)
+
+
+def bad_request_on_invalid_parameter(view):
+    @wraps(view)
+    async def inner(request, *args, **kwargs):
+        try:
+            return await view(request, *args, **kwargs)
+        except InvalidParameter as error:
+            return HttpResponseBadRequest(str(error))
+
+    return inner
+
+
+def get_document_column(fields):
+    """Документ целиком или объект только из полей fields. Названия полей
+    берутся из API_FIELDS, поэтому их можно подставить в текст запроса."""
+    if fields == API_FIELDS:
+        return "document"
+    return "jsonb_build_object({})".format(
+        ", ".join(f"'{field}', document -> '{field}'" for field in fields)
+    )
+
+
+def get_page_number(value, num_pages):
+    if value == "last":
+        return num_pages
+    try:
+        number = int(value)
+    except (TypeError, ValueError):
+        raise Http404("Неверный номер страницы")
+    if not 1 <= number <= num_pages:
+        raise Http404("Страница не найдена")
+    return number
+
+
+async def cached(key, fields, render):
+    """Тело ответа из кэша или от render, как в MoviesApiMixin.get."""
+    variant = ",".join(fields)
+    if (content := await aget_response(key, variant)) is None:
+        content = JsonResponse(await render()).content
+        await aset_response(key, variant, content)
+    return HttpResponse(content, content_type="application/json")
+
+
+async def get_page_context(column, fields, page):
+    per_page = MoviesListApi.paginate_by
+    count = await fetchval("SELECT count(*) FROM film_work_document")
+    num_pages = max(1, math.ceil(count / per_page))
+    number = get_page_number(page, num_pages)
+    rows = await fetch(
+        f"SELECT id, {column} FROM film_work_document ORDER BY id LIMIT $1 OFFSET $2",
+        per_page,
+        (number - 1) * per_page,
+    )
+    return {
+        "count": count,
+        "total_pages": num_pages,
+        "prev": number - 1 if number > 1 else None,
+        "next": number + 1 if number < num_pages else None,
+        "results": [serialize_document(document, fields) for _, document in rows],
+    }
+
+
+async def get_keyset_context(column, fields, token):
+    per_page = MoviesListApi.paginate_by
+    if (after := decode_cursor(token)) is None:
+        rows = await fetch(
+            f"SELECT id, {column} FROM film_work_document ORDER BY id LIMIT $1", per_page + 1
+        )
+    else:
+        rows = await fetch(
+            f"SELECT id, {column} FROM film_work_document WHERE id > $1 ORDER BY id LIMIT $2",
+            after,
+            per_page + 1,
+        )
+    page = rows[:per_page]
+    return {
+        "next": encode_cursor(page[-1][0]) if len(rows) > per_page else None,
+        "results": [serialize_document(document, fields) for _, document in page],
+    }
+
+
+async def get_batch_context(column, fields, value):
+    ids = parse_ids(value, MoviesListApi.max_ids)
+    rows = await fetch(
+        f"SELECT id, {column} FROM film_work_document WHERE id = ANY($1::uuid[]) ORDER BY id",
+        list(ids),
+    )
+    return {"results": [serialize_document(document, fields) for _, document in rows]}
+
+
+@bad_request_on_invalid_parameter
+async def movies_list(request):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    fields = parse_fields(request.GET.get("fields"))
+    column = get_document_column(fields)
+
+    async def render():
+        if "ids" in request.GET:
+            return await get_batch_context(column, fields, request.GET["ids"])
+        if "after" in request.GET:
+            return await get_keyset_context(column, fields, request.GET["after"])
+        return await get_page_context(column, fields, request.GET.get("page", 1))
+
+    return await cached(await aget_list_key(request.GET), fields, render)
+
+
+@bad_request_on_invalid_parameter
+async def movies_detail(request, pk):
+    if request.method != "GET":
+        return HttpResponseNotAllowed(["GET"])
+    fields = parse_fields(request.GET.get("fields"))
+
+    async def render():
+        rows = await fetch(
+            f"SELECT {get_document_column(fields)} FROM film_work_document WHERE id = $1", pk
+        )
+        if not rows:
+            raise Http404("Кинопроизведение не найдено")
+        return serialize_document(rows[0][0], fields)
+
+    return await cached(get_detail_key(pk), fields, render)
@@ -1,8 +1,17 @@
+from django.conf import settings
 from django.urls import path
 
 from movies.api.v1 import views
 
-urlpatterns = [
-    path("movies/", views.MoviesListApi.as_view()),
-    path("movies/<uuid:pk>", views.MoviesDetailApi.as_view()),
-]
+if settings.ASYNC_API:
+    from movies.api.v1 import async_views
+
+    urlpatterns = [
+        path("movies/", async_views.movies_list),
+        path("movies/<uuid:pk>", async_views.movies_detail),
+    ]
+else:
+    urlpatterns = [
+        path("movies/", views.MoviesListApi.as_view()),
+        path("movies/<uuid:pk>", views.MoviesDetailApi.as_view()),
+    ]
@@ -1,37 +1,123 @@
-from django.contrib.postgres.aggregates import ArrayAgg
-from django.db.models import OuterRef, Subquery, Value
-from django.db.models.functions import Coalesce
-from django.http import JsonResponse
+import base64
+import binascii
+import uuid
+
+from django.db.models import Func, JSONField, Value
+from django.db.models.fields.json import KeyTransform
+from django.http import HttpResponse, HttpResponseBadRequest, JsonResponse
 from django.views.generic.detail import BaseDetailView
 from django.views.generic.list import BaseListView
 
-from movies.models import FilmWork, PersonFilmWork, Role
+from movies.cache import get_detail_key, get_list_key, get_response, set_response
+from movies.models import FilmWorkDocument
+
+API_FIELDS = (
+    "id",
+    "title",
+    "description",
+    "creation_date",
+    "rating",
+    "type",
+    "genres",
+    "actors",
+    "directors",
+    "writers",
+)
+NAME_KEYS = {"genres": "name", "actors": "full_name", "directors": "full_name", "writers": "full_name"}
+
+
+class InvalidParameter(Exception):
+    """Неверный параметр запроса, ответ — 400 Bad Request."""
+
+
+def get_names(items, key):
+    return [item[key] for item in items or []]
+
+
+def encode_cursor(film_work_id):
+    return base64.urlsafe_b64encode(film_work_id.bytes).rstrip(b"=").decode("ascii")
+
+
+def decode_cursor(token):
+    """id кинопроизведения из токена after, пустой токен — первая страница."""
+    if not token:
+        return None
+    try:
+        return uuid.UUID(bytes=base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except (binascii.Error, ValueError):
+        raise InvalidParameter("Неверный токен страницы")
+
+
+def parse_fields(value):
+    """Поля ответа из параметра fields, по умолчанию все."""
+    if not value:
+        return API_FIELDS
+    requested = set(value.split(","))
+    if unknown := requested.difference(API_FIELDS):
+        raise InvalidParameter(f"Неизвестные поля: {', '.join(sorted(unknown))}")
+    return tuple(field for field in API_FIELDS if field in requested)
+
+
+def parse_ids(value, max_ids):
+    """id кинопроизведений из списка через запятую, не больше max_ids."""
+    try:
+        ids = {uuid.UUID(film_work_id) for film_work_id in value.split(",") if film_work_id}
+    except ValueError:
+        raise InvalidParameter("Неверный id кинопроизведения")
+    if len(ids) > max_ids:
+        raise InvalidParameter(f"Можно запросить не больше {max_ids} кинопроизведений")
+    return ids
+
+
+def serialize_document(document, fields=API_FIELDS):
+    """Ответ API из денормализованного документа кинопроизведения."""
+    return {
+        field: get_names(document[field], NAME_KEYS[field])
+        if field in NAME_KEYS
+        else document[field]
+        for field in fields
+    }
 
 
 class MoviesApiMixin:
-    model = FilmWork
+    model = FilmWorkDocument
     http_method_names = ["get"]
 
+    def get_fields(self):
+        return parse_fields(self.request.GET.get("fields"))
+
     def get_queryset(self):
-        persons = (
-            PersonFilmWork.objects.values("film_work_id", "role")
-            .annotate(persons=ArrayAgg("person__full_name"))
-            .filter(film_work_id=OuterRef("pk"))
-        )
-        genres = (
-            FilmWork.objects.values("id")
-            .annotate(genres=ArrayAgg("genres__name"))
-            .filter(id=OuterRef("pk"))
-        )
-        return (
-            FilmWork.objects.all()
-            .values("id", "title", "description", "creation_date", "rating", "type")
-            .annotate(genres=Subquery(genres.values("genres")))
-            .annotate(actors=Coalesce(Subquery(persons.filter(role=Role.ACTOR).values("persons")), Value([])))
-            .annotate(directors=Coalesce(Subquery(persons.filter(role=Role.PRODUCER).values("persons")), Value([])))
-            .annotate(writers=Coalesce(Subquery(persons.filter(role=Role.SCREENWRITER).values("persons")), Value([])))
-            .order_by("id")
+        """Пары (id, документ). Если запрошены не все поля, документ собирается
+        в базе только из нужных ключей: ненужные персоны и жанры не передаются
+        по сети и не разбираются из JSON."""
+        queryset = FilmWorkDocument.objects.order_by("id")
+        if (fields := self.get_fields()) == API_FIELDS:
+            return queryset.values_list("id", "document")
+        projection = Func(
+            *(
+                expression
+                for field in fields
+                for expression in (Value(field), KeyTransform(field, "document"))
+            ),
+            function="jsonb_build_object",
+            output_field=JSONField(),
         )
+        return queryset.annotate(projection=projection).values_list("id", "projection")
+
+    def get(self, request, *args, **kwargs):
+        """Отдаёт сохранённое тело ответа, если оно есть в кэше. Ключ кэша
+        задаёт get_cache_key представления."""
+        try:
+            key = self.get_cache_key()
+            variant = ",".join(self.get_fields())
+            if (content := get_response(key, variant)) is not None:
+                return HttpResponse(content, content_type="application/json")
+            response = super().get(request, *args, **kwargs)
+        except InvalidParameter as error:
+            return HttpResponseBadRequest(str(error))
+        if response.status_code == 200:
+            set_response(key, variant, response.content)
+        return response
 
     def render_to_response(self, context, **response_kwargs):
         return JsonResponse(context)
@@ -39,8 +125,16 @@ class MoviesApiMixin:
 
 class MoviesListApi(MoviesApiMixin, BaseListView):
     paginate_by = 50
+    max_ids = 200
+
+    def get_cache_key(self):
+        return get_list_key(self.request.GET)
 
     def get_context_data(self, *, object_list=None, **kwargs):
+        if "ids" in self.request.GET:
+            return self.get_batch_context(self.request.GET["ids"])
+        if "after" in self.request.GET:
+            return self.get_keyset_context(self.request.GET["after"])
         queryset = self.get_queryset()
         paginator, page, queryset, is_paginated = self.paginate_queryset(
             queryset, self.paginate_by
@@ -51,11 +145,36 @@ class MoviesListApi(MoviesApiMixin, BaseListView):
             "total_pages": paginator.num_pages,
             "prev": page.previous_page_number() if page.has_previous() else None,
             "next": page.next_page_number() if page.has_next() else None,
-            "results": list(page.object_list),
+            "results": self.serialize(page.object_list),
         }
         return context
 
+    def serialize(self, rows):
+        fields = self.get_fields()
+        return [serialize_document(document, fields) for _, document in rows]
+
+    def get_batch_context(self, value):
+        ids = parse_ids(value, self.max_ids)
+        return {"results": self.serialize(self.get_queryset().filter(id__in=ids))}
+
+    def get_keyset_context(self, token):
+        """Страница после кинопроизведения из токена after: выборка по индексу id
+        без OFFSET и без подсчёта общего количества."""
+        queryset = self.get_queryset()
+        if (after := decode_cursor(token)) is not None:
+            queryset = queryset.filter(id__gt=after)
+        rows = list(queryset[: self.paginate_by + 1])
+        page = rows[: self.paginate_by]
+        return {
+            "next": encode_cursor(page[-1][0]) if len(rows) > self.paginate_by else None,
+            "results": self.serialize(page),
+        }
+
 
 class MoviesDetailApi(MoviesApiMixin, BaseDetailView):
+    def get_cache_key(self):
+        return get_detail_key(self.kwargs["pk"])
+
     def get_context_data(self, object):
-        return object
+        _, document = object
+        return serialize_document(document, self.get_fields())
@@ -0,0 +1,51 @@
+"""Пул асинхронных подключений к Postgres для async-представлений API.
+
+В Django 3.1 нет асинхронного ORM, поэтому запросы к film_work_document
+выполняются через asyncpg. Пул создаётся при первом запросе в цикле событий
+ASGI-сервера и живёт, пока работает процесс."""
+import asyncio
+import json
+
+import asyncpg
+from django.conf import settings
+
+_pool = None
+
+
+async def init_connection(connection):
+    await connection.set_type_codec(
+        "jsonb", encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+    )
+
+
+async def get_pool():
+    global _pool
+    if _pool is None:
+        database = settings.DATABASES["default"]
+        _pool = asyncio.ensure_future(
+            asyncpg.create_pool(
+                database=database["NAME"],
+                user=database["USER"],
+                password=database["PASSWORD"],
+                host=database["HOST"],
+                port=database["PORT"],
+                min_size=settings.ASYNC_DB_POOL_MIN_SIZE,
+                max_size=settings.ASYNC_DB_POOL_MAX_SIZE,
+                init=init_connection,
+            )
+        )
+    try:
+        return await _pool
+    except (OSError, asyncpg.PostgresError):
+        _pool = None
+        raise
+
+
+async def fetch(query, *args):
+    pool = await get_pool()
+    return await pool.fetch(query, *args)
+
+
+async def fetchval(query, *args):
+    pool = await get_pool()
+    return await pool.fetchval(query, *args)
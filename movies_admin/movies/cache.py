@@ -0,0 +1,46 @@
+import hashlib
+import time
+
+from django.core.cache import cache
+from django.db import transaction
+
+LIST_VERSION_KEY = "movies:list:version"
+
+
+def get_detail_key(film_work_id):
+    return f"movies:detail:{film_work_id}"
+
+
+def get_list_key(query):
+    """Ключ страницы списка: версия списка и параметры запроса без учёта их порядка."""
+    version = cache.get_or_set(LIST_VERSION_KEY, time.time_ns(), None)
+    params = "&".join(f"{key}={value}" for key, value in sorted(query.items()))
+    return f"movies:list:{version}:{hashlib.md5(params.encode('utf-8')).hexdigest()}"
+
+
+def get_response(key, variant):
+    return (cache.get(key) or {}).get(variant)
+
+
+def set_response(key, variant, content):
+    """Сохраняет тело ответа. Варианты одного ответа (с разными fields)
+    хранятся в одной записи, поэтому сбрасываются вместе с ней."""
+    entry = cache.get(key) or {}
+    entry[variant] = content
+    cache.set(key, entry)
+
+
+def invalidate_film_works(film_work_ids):
+    """Удаляет из кэша ответы по кинопроизведениям и все страницы списка.
+
+    Страницы не удаляются по одной: смена версии списка делает недоступными
+    все ранее сохранённые страницы, а старые записи удалит TTL или вытеснение.
+    Кэш очищается после фиксации транзакции, иначе параллельный запрос
+    успел бы сохранить в кэш ещё не изменённый документ."""
+    keys = [get_detail_key(film_work_id) for film_work_id in film_work_ids]
+
+    def invalidate():
+        cache.delete_many(keys)
+        cache.set(LIST_VERSION_KEY, time.time_ns(), None)
+
+    transaction.on_commit(invalidate)
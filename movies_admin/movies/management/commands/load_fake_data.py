@@ -1,10 +1,19 @@
+import csv
+import io
 import logging
+import os
+import random
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from math import ceil
 from random import choice, randint, sample
 
 from django.contrib.auth.models import User
+from django.core.management import call_command
 from django.core.management.base import BaseCommand
-from django.db import transaction
+from django.db import connection, connections, transaction
+from django.utils import timezone
+from faker import Faker
 from progress.bar import IncrementalBar
 
 from movies.factories import (FilmWorkFactory, GenreFactory, PersonFactory,
@@ -19,6 +28,7 @@ SERIALS_COUNT = 300000
 CHUNK_SIZE = 10000
 MAX_GENRES_NUMBER = 4
 MAX_PERSONS_NUMBER = 10
+COPY_TABLES = ("genre", "person", "film_work", "genre_film_work", "person_film_work")
 
 logging.basicConfig()
 logger = logging.getLogger(__name__)
@@ -89,14 +99,198 @@ def generate_film_works(genres: list, persons: list, type: FilmWorkType) -> None
         bar.next()
 
 
+def get_uuid(rng: random.Random) -> uuid.UUID:
+    return uuid.UUID(int=rng.getrandbits(128), version=4)
+
+
+def copy_rows(cursor, table: str, columns: tuple, rows: list) -> None:
+    """Загружает строки в таблицу через COPY из CSV-буфера."""
+    buffer = io.StringIO()
+    csv.writer(buffer, quoting=csv.QUOTE_ALL).writerows(rows)
+    buffer.seek(0)
+    cursor.copy_expert(
+        f"COPY {table} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)", buffer
+    )
+
+
+def copy_genres_and_persons(seed: int) -> tuple:
+    """Генерация жанров и персон через COPY, возвращает их id."""
+    rng = random.Random(seed)
+    fake = Faker("ru_RU")
+    fake.seed_instance(seed)
+    now = timezone.now().isoformat()
+    genres = [(get_uuid(rng), fake.word(), "", now, now) for _ in range(GENRES_COUNT)]
+    persons = [(get_uuid(rng), fake.name(), now, now) for _ in range(PERSONS_COUNT)]
+    with connection.cursor() as cursor:
+        copy_rows(
+            cursor, "genre", ("id", "name", "description", "created_at", "updated_at"), genres
+        )
+        copy_rows(cursor, "person", ("id", "full_name", "created_at", "updated_at"), persons)
+    return [genre[0] for genre in genres], [person[0] for person in persons]
+
+
+_genre_ids = None
+_person_ids = None
+
+
+def init_copy_worker(genre_ids: list, person_ids: list) -> None:
+    global _genre_ids, _person_ids
+    _genre_ids = genre_ids
+    _person_ids = person_ids
+
+
+def copy_film_works_chunk(seed: int, number: int, type: FilmWorkType, count: int) -> int:
+    """Генерация и загрузка через COPY одной пачки кинопроизведений со связями.
+
+    Генераторы пачки инициализируются от seed и номера пачки, поэтому данные
+    не зависят от числа процессов и порядка выполнения пачек."""
+    rng = random.Random(f"{seed}:{type}:{number}")
+    fake = Faker("ru_RU")
+    fake.seed_instance(f"{seed}:{type}:{number}")
+    now = timezone.now().isoformat()
+    roles = list(Role)
+    film_works = []
+    genres = []
+    persons = []
+    for _ in range(count):
+        film_work_id = get_uuid(rng)
+        film_works.append(
+            (
+                film_work_id,
+                fake.text(max_nb_chars=20),
+                fake.paragraph(),
+                fake.date_time().date().isoformat(),
+                "",
+                "",
+                round(rng.uniform(1.0, 10.0), 2),
+                type,
+                now,
+                now,
+            )
+        )
+        for genre_id in rng.sample(_genre_ids, rng.randint(1, MAX_GENRES_NUMBER)):
+            genres.append((get_uuid(rng), film_work_id, genre_id, now, now))
+        for person_id in rng.sample(_person_ids, rng.randint(1, MAX_PERSONS_NUMBER)):
+            persons.append((get_uuid(rng), film_work_id, person_id, rng.choice(roles), now, now))
+    with transaction.atomic(), connection.cursor() as cursor:
+        copy_rows(
+            cursor,
+            "film_work",
+            (
+                "id",
+                "title",
+                "description",
+                "creation_date",
+                "certificate",
+                "file_path",
+                "rating",
+                "type",
+                "created_at",
+                "updated_at",
+            ),
+            film_works,
+        )
+        copy_rows(
+            cursor,
+            "genre_film_work",
+            ("id", "film_work_id", "genre_id", "created_at", "updated_at"),
+            genres,
+        )
+        copy_rows(
+            cursor,
+            "person_film_work",
+            ("id", "film_work_id", "person_id", "role", "created_at", "updated_at"),
+            persons,
+        )
+    return count
+
+
+def drop_indexes(cursor) -> list:
+    """Удаляет индексы таблиц COPY_TABLES, кроме индексов ограничений
+    (первичные ключи), и возвращает их определения для пересоздания."""
+    cursor.execute(
+        """
+        SELECT i.indexrelid::regclass::text, pg_get_indexdef(i.indexrelid)
+        FROM pg_index i
+        WHERE i.indrelid = ANY (%s::regclass[])
+          AND NOT EXISTS (SELECT 1 FROM pg_constraint c WHERE c.conindid = i.indexrelid)
+        """,
+        [list(COPY_TABLES)],
+    )
+    indexes = cursor.fetchall()
+    for name, _ in indexes:
+        cursor.execute(f"DROP INDEX {name}")
+    return [definition for _, definition in indexes]
+
+
+def set_user_triggers(cursor, enabled: bool) -> None:
+    """Включает или отключает пользовательские триггеры (уведомления ETL, журнал
+    удалений, документы). Триггеры внешних ключей остаются включёнными."""
+    for table in COPY_TABLES:
+        cursor.execute(f"ALTER TABLE {table} {'ENABLE' if enabled else 'DISABLE'} TRIGGER USER")
+
+
+def copy_film_works(seed: int, workers: int, genre_ids: list, person_ids: list) -> None:
+    """Генерация кинопроизведений пачками по CHUNK_SIZE в workers процессах."""
+    chunks = []
+    for type, total in ((FilmWorkType.SERIAL, SERIALS_COUNT), (FilmWorkType.MOVIE, MOVIES_COUNT)):
+        for number in range(ceil(total / CHUNK_SIZE)):
+            chunks.append((seed, number, type, min(CHUNK_SIZE, total - number * CHUNK_SIZE)))
+    bar = IncrementalBar("processing", max=len(chunks), suffix="%(percent)d%%")
+    logger.info("start generate film works (workers: %s)...", workers)
+    connections.close_all()
+    with ProcessPoolExecutor(
+        max_workers=workers, initializer=init_copy_worker, initargs=(genre_ids, person_ids)
+    ) as executor:
+        futures = [executor.submit(copy_film_works_chunk, *chunk) for chunk in chunks]
+        for future in as_completed(futures):
+            future.result()
+            bar.next()
+    bar.finish()
+
+
+def generate_with_copy(seed: int, workers: int) -> None:
+    """Быстрая генерация через COPY: на время загрузки отключаются
+    пользовательские триггеры и удаляются индексы, после загрузки индексы
+    пересоздаются и заполняется film_work_document."""
+    with connection.cursor() as cursor:
+        set_user_triggers(cursor, False)
+        indexes = drop_indexes(cursor)
+    try:
+        logger.info("start generate genres and persons...")
+        genre_ids, person_ids = copy_genres_and_persons(seed)
+        copy_film_works(seed, workers, genre_ids, person_ids)
+    finally:
+        with connection.cursor() as cursor:
+            logger.info("creating indexes...")
+            for definition in indexes:
+                cursor.execute(definition)
+            set_user_triggers(cursor, True)
+            cursor.execute(f"ANALYZE {', '.join(COPY_TABLES)}")
+    call_command("refresh_film_work_documents")
+
+
 class Command(BaseCommand):
     help = "Generate and save data"
 
-    @transaction.atomic
-    def handle(self, *args, **kwargs):
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--copy",
+            action="store_true",
+            help="load through COPY in parallel workers (ETL needs a full reindex afterwards)",
+        )
+        parser.add_argument("--workers", type=int, default=os.cpu_count())
+        parser.add_argument("--seed", type=int, default=0)
+
+    def handle(self, *args, copy, workers, seed, **kwargs):
         generate_users()
-        genres = generate_genres()
-        persons = generate_persons()
-        generate_film_works(genres, persons, FilmWorkType.SERIAL)
-        generate_film_works(genres, persons, FilmWorkType.MOVIE)
-        logger.info("saving...")
+        if copy:
+            generate_with_copy(seed, workers)
+            logger.info("completed")
+            return
+        with transaction.atomic():
+            genres = generate_genres()
+            persons = generate_persons()
+            generate_film_works(genres, persons, FilmWorkType.SERIAL)
+            generate_film_works(genres, persons, FilmWorkType.MOVIE)
+            logger.info("saving...")
@@ -0,0 +1,46 @@
+import logging
+from math import ceil
+
+from django.core.management.base import BaseCommand
+from django.db import connection
+from progress.bar import IncrementalBar
+
+from movies.models import FilmWork
+
+CHUNK_SIZE = 1000
+
+logging.basicConfig()
+logger = logging.getLogger(__name__)
+logger.setLevel(logging.INFO)
+
+
+class Command(BaseCommand):
+    help = "Rebuild denormalized film work documents"
+
+    def add_arguments(self, parser):
+        parser.add_argument("--chunk-size", type=int, default=CHUNK_SIZE)
+
+    def handle(self, *args, chunk_size, **kwargs):
+        film_works = FilmWork.objects.order_by("id").values_list("id", flat=True)
+        bar = IncrementalBar(
+            "processing", max=ceil(film_works.count() / chunk_size), suffix="%(percent)d%%"
+        )
+        logger.info("start refresh film work documents...")
+        with connection.cursor() as cursor:
+            last_id = None
+            while True:
+                chunk = film_works.filter(id__gt=last_id) if last_id else film_works
+                ids = list(chunk[:chunk_size])
+                if not ids:
+                    break
+                cursor.execute("SELECT refresh_film_work_documents(%s::uuid[])", [ids])
+                last_id = ids[-1]
+                bar.next()
+            cursor.execute(
+                """
+                DELETE FROM film_work_document d
+                WHERE NOT EXISTS (SELECT 1 FROM film_work fw WHERE fw.id = d.id)
+                """
+            )
+        bar.finish()
+        logger.info("completed")
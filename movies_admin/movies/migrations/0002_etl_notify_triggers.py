@@ -0,0 +1,38 @@
+from django.db import migrations
+
+TABLES = ("film_work", "person", "genre", "person_film_work", "genre_film_work")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            CREATE FUNCTION notify_etl() RETURNS trigger AS $$
+            BEGIN
+                PERFORM pg_notify('etl_changes', TG_TABLE_NAME);
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+        """,
+            reverse_sql="""
+            DROP FUNCTION notify_etl();
+        """,
+        ),
+    ] + [
+        migrations.RunSQL(
+            sql=f"""
+            CREATE TRIGGER {table}_notify_etl
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "{table}"
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_etl();
+        """,
+            reverse_sql=f"""
+            DROP TRIGGER {table}_notify_etl ON "{table}";
+        """,
+        )
+        for table in TABLES
+    ]
@@ -0,0 +1,21 @@
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0002_etl_notify_triggers'),
+    ]
+
+    operations = [
+        migrations.RunSQL(
+            sql="""
+            ALTER TABLE "person_film_work" REPLICA IDENTITY FULL;
+            ALTER TABLE "genre_film_work" REPLICA IDENTITY FULL;
+        """,
+            reverse_sql="""
+            ALTER TABLE "person_film_work" REPLICA IDENTITY DEFAULT;
+            ALTER TABLE "genre_film_work" REPLICA IDENTITY DEFAULT;
+        """,
+        ),
+    ]
@@ -0,0 +1,61 @@
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0003_link_tables_replica_identity'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='Tombstone',
+            fields=[
+                ('id', models.BigAutoField(primary_key=True, serialize=False)),
+                ('table_name', models.CharField(max_length=50, verbose_name='таблица')),
+                ('film_work_id', models.UUIDField(verbose_name='кинопроизведение')),
+                ('deleted_at', models.DateTimeField(auto_now_add=True)),
+            ],
+            options={
+                'verbose_name': 'удаление',
+                'verbose_name_plural': 'удаления',
+                'db_table': 'tombstone',
+            },
+        ),
+        migrations.RunSQL(
+            sql="""
+            CREATE FUNCTION log_film_work_deletion() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO tombstone (table_name, film_work_id, deleted_at)
+                SELECT TG_TABLE_NAME, id, now() FROM deleted_rows;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE FUNCTION log_link_deletion() RETURNS trigger AS $$
+            BEGIN
+                INSERT INTO tombstone (table_name, film_work_id, deleted_at)
+                SELECT TG_TABLE_NAME, film_work_id, now() FROM deleted_rows;
+                RETURN NULL;
+            END;
+            $$ LANGUAGE plpgsql;
+
+            CREATE TRIGGER film_work_tombstone
+                AFTER DELETE ON "film_work" REFERENCING OLD TABLE AS deleted_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_film_work_deletion();
+            CREATE TRIGGER person_film_work_tombstone
+                AFTER DELETE ON "person_film_work" REFERENCING OLD TABLE AS deleted_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_link_deletion();
+            CREATE TRIGGER genre_film_work_tombstone
+                AFTER DELETE ON "genre_film_work" REFERENCING OLD TABLE AS deleted_rows
+                FOR EACH STATEMENT EXECUTE FUNCTION log_link_deletion();
+        """,
+            reverse_sql="""
+            DROP TRIGGER film_work_tombstone ON "film_work";
+            DROP TRIGGER person_film_work_tombstone ON "person_film_work";
+            DROP TRIGGER genre_film_work_tombstone ON "genre_film_work";
+            DROP FUNCTION log_film_work_deletion();
+            DROP FUNCTION log_link_deletion();
+        """,
+        ),
+    ]
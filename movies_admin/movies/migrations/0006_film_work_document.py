@@ -0,0 +1,178 @@
+from django.db import migrations, models
+
+REFRESH_FUNCTION = """
+CREATE FUNCTION refresh_film_work_documents(ids uuid[]) RETURNS void AS $$
+    INSERT INTO film_work_document (id, document, doc_updated_at)
+    SELECT fw.id
+         , jsonb_build_object(
+               'id', fw.id,
+               'title', fw.title,
+               'description', fw.description,
+               'creation_date', fw.creation_date,
+               'rating', fw.rating,
+               'type', fw.type,
+               'genres', g.genres,
+               'actors', p.actors,
+               'directors', p.directors,
+               'writers', p.writers,
+               'writers_names', p.writers_names,
+               'actors_names', p.actors_names,
+               'directors_names', p.directors_names,
+               'genres_names', g.genres_names
+           )
+         , now()
+    FROM film_work fw
+             LEFT JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'actor')        actors
+             , jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'producer')     directors
+             , jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'screenwriter') writers
+             , string_agg(p.full_name, ', ' ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'actor')        actors_names
+             , string_agg(p.full_name, ', ' ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'producer')     directors_names
+             , string_agg(p.full_name, ', ' ORDER BY p.full_name) FILTER ( WHERE pfw.role = 'screenwriter') writers_names
+        FROM person_film_work pfw
+                 JOIN person p ON pfw.person_id = p.id
+        WHERE pfw.film_work_id = fw.id
+        ) p ON true
+             LEFT JOIN LATERAL (
+        SELECT jsonb_agg(jsonb_build_object('id', g.id, 'name', g.name) ORDER BY g.name) genres
+             , string_agg(g.name, ', ' ORDER BY g.name)                                  genres_names
+        FROM genre_film_work gfw
+                 JOIN genre g ON gfw.genre_id = g.id
+        WHERE gfw.film_work_id = fw.id
+        ) g ON true
+    WHERE fw.id = ANY (ids)
+    ON CONFLICT (id) DO UPDATE SET document       = EXCLUDED.document,
+                                   doc_updated_at = EXCLUDED.doc_updated_at;
+$$ LANGUAGE sql;
+"""
+
+TRIGGER_FUNCTION = """
+CREATE FUNCTION film_work_document_trigger() RETURNS trigger AS $$
+BEGIN
+    IF TG_TABLE_NAME = 'film_work' THEN
+        IF TG_OP = 'DELETE' THEN
+            DELETE FROM film_work_document WHERE id IN (SELECT id FROM old_rows);
+        ELSE
+            PERFORM refresh_film_work_documents(ARRAY(SELECT id FROM new_rows));
+        END IF;
+    ELSIF TG_TABLE_NAME = 'person' THEN
+        PERFORM refresh_film_work_documents(ARRAY(
+            SELECT DISTINCT pfw.film_work_id
+            FROM person_film_work pfw
+                     JOIN new_rows ON new_rows.id = pfw.person_id
+        ));
+    ELSIF TG_TABLE_NAME = 'genre' THEN
+        PERFORM refresh_film_work_documents(ARRAY(
+            SELECT DISTINCT gfw.film_work_id
+            FROM genre_film_work gfw
+                     JOIN new_rows ON new_rows.id = gfw.genre_id
+        ));
+    ELSIF TG_OP = 'INSERT' THEN
+        PERFORM refresh_film_work_documents(ARRAY(SELECT DISTINCT film_work_id FROM new_rows));
+    ELSIF TG_OP = 'DELETE' THEN
+        PERFORM refresh_film_work_documents(ARRAY(SELECT DISTINCT film_work_id FROM old_rows));
+    ELSE
+        PERFORM refresh_film_work_documents(ARRAY(
+            SELECT film_work_id FROM new_rows UNION SELECT film_work_id FROM old_rows
+        ));
+    END IF;
+    RETURN NULL;
+END;
+$$ LANGUAGE plpgsql;
+"""
+
+BACKFILL_CHUNK_SIZE = 1000
+
+
+def backfill_documents(apps, schema_editor):
+    """Собирает документы уже существующих кинопроизведений пачками по id."""
+    with schema_editor.connection.cursor() as cursor:
+        last_id = None
+        while True:
+            if last_id is None:
+                cursor.execute(
+                    "SELECT id FROM film_work ORDER BY id LIMIT %s", [BACKFILL_CHUNK_SIZE]
+                )
+            else:
+                cursor.execute(
+                    "SELECT id FROM film_work WHERE id > %s ORDER BY id LIMIT %s",
+                    [last_id, BACKFILL_CHUNK_SIZE],
+                )
+            ids = [row[0] for row in cursor.fetchall()]
+            if not ids:
+                break
+            cursor.execute("SELECT refresh_film_work_documents(%s::uuid[])", [ids])
+            last_id = ids[-1]
+
+
+TRIGGERS = (
+    ("film_work", "INSERT", "NEW TABLE AS new_rows"),
+    ("film_work", "UPDATE", "NEW TABLE AS new_rows"),
+    ("film_work", "DELETE", "OLD TABLE AS old_rows"),
+    ("person", "UPDATE", "NEW TABLE AS new_rows"),
+    ("genre", "UPDATE", "NEW TABLE AS new_rows"),
+    ("person_film_work", "INSERT", "NEW TABLE AS new_rows"),
+    ("person_film_work", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("person_film_work", "DELETE", "OLD TABLE AS old_rows"),
+    ("genre_film_work", "INSERT", "NEW TABLE AS new_rows"),
+    ("genre_film_work", "UPDATE", "OLD TABLE AS old_rows NEW TABLE AS new_rows"),
+    ("genre_film_work", "DELETE", "OLD TABLE AS old_rows"),
+)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('movies', '0005_etl_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='FilmWorkDocument',
+            fields=[
+                ('id', models.UUIDField(primary_key=True, serialize=False)),
+                ('document', models.JSONField()),
+                ('doc_updated_at', models.DateTimeField()),
+            ],
+            options={
+                'verbose_name': 'документ кинопроизведения',
+                'verbose_name_plural': 'документы кинопроизведений',
+                'db_table': 'film_work_document',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='filmworkdocument',
+            index=models.Index(fields=['doc_updated_at', 'id'], name='fwd_doc_updated_at_idx'),
+        ),
+        migrations.RunSQL(
+            sql=REFRESH_FUNCTION + TRIGGER_FUNCTION,
+            reverse_sql="""
+            DROP FUNCTION film_work_document_trigger();
+            DROP FUNCTION refresh_film_work_documents(uuid[]);
+        """,
+        ),
+        migrations.RunPython(backfill_documents, migrations.RunPython.noop),
+    ] + [
+        migrations.RunSQL(
+            sql=f"""
+            CREATE TRIGGER {table}_{event.lower()}_document
+                AFTER {event} ON "{table}" REFERENCING {transition}
+                FOR EACH STATEMENT EXECUTE FUNCTION film_work_document_trigger();
+        """,
+            reverse_sql=f"""
+            DROP TRIGGER {table}_{event.lower()}_document ON "{table}";
+        """,
+        )
+        for table, event, transition in TRIGGERS
+    ] + [
+        migrations.RunSQL(
+            sql="""
+            CREATE TRIGGER film_work_document_notify_etl
+                AFTER INSERT OR UPDATE OR DELETE OR TRUNCATE ON "film_work_document"
+                FOR EACH STATEMENT EXECUTE FUNCTION notify_etl();
+        """,
+            reverse_sql="""
+            DROP TRIGGER film_work_document_notify_etl ON "film_work_document";
+        """,
+        ),
+    ]
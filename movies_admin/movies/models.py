@@ -26,6 +26,7 @@ class Genre(TimeStampedModel):
         verbose_name = _("жанр")
         verbose_name_plural = _("жанры")
         db_table = "genre"
+        indexes = [models.Index(fields=["updated_at", "id"], name="genre_updated_at_idx")]
 
     def __str__(self):
         return self.name
@@ -41,6 +42,7 @@ class Person(TimeStampedModel):
         verbose_name = _("персона")
         verbose_name_plural = _("персоны")
         db_table = "person"
+        indexes = [models.Index(fields=["updated_at", "id"], name="person_updated_at_idx")]
 
     def __str__(self):
         return self.full_name
@@ -76,6 +78,7 @@ class FilmWork(TimeStampedModel):
         verbose_name = _("кинопроизведение")
         verbose_name_plural = _("кинопроизведения")
         db_table = "film_work"
+        indexes = [models.Index(fields=["updated_at", "id"], name="film_work_updated_at_idx")]
 
     def __str__(self):
         return self.title
@@ -93,12 +96,17 @@ class PersonFilmWork(TimeStampedModel):
     """Модель для связи персоны и кинопроизвдения."""
 
     id = models.UUIDField(primary_key=True, default=uuid.uuid4, editable=False)
-    film_work = models.ForeignKey(FilmWork, on_delete=models.CASCADE)
+    # поиск по film_work_id обслуживает pfw_film_work_role_idx
+    film_work = models.ForeignKey(FilmWork, on_delete=models.CASCADE, db_index=False)
     person = models.ForeignKey(Person, on_delete=models.CASCADE)
     role = models.CharField(_("роль"), max_length=20, choices=Role.choices)
 
     class Meta:
         db_table = "person_film_work"
+        indexes = [
+            models.Index(fields=["updated_at", "id"], name="pfw_updated_at_idx"),
+            models.Index(fields=["film_work", "role"], name="pfw_film_work_role_idx"),
+        ]
 
 
 class GenreFilmWork(TimeStampedModel):
@@ -110,3 +118,37 @@ class GenreFilmWork(TimeStampedModel):
 
     class Meta:
         db_table = "genre_film_work"
+        indexes = [models.Index(fields=["updated_at", "id"], name="gfw_updated_at_idx")]
+
+
+class Tombstone(models.Model):
+    """Журнал удалений кинопроизведений и их связей для ETL.
+
+    Заполняется триггерами базы данных, очищается ETL после загрузки в elastic search."""
+
+    id = models.BigAutoField(primary_key=True)
+    table_name = models.CharField(_("таблица"), max_length=50)
+    film_work_id = models.UUIDField(_("кинопроизведение"))
+    deleted_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        verbose_name = _("удаление")
+        verbose_name_plural = _("удаления")
+        db_table = "tombstone"
+
+
+class FilmWorkDocument(models.Model):
+    """Денормализованный документ кинопроизведения для ETL и API.
+
+    Поддерживается триггерами базы данных, полностью пересобирается командой
+    refresh_film_work_documents."""
+
+    id = models.UUIDField(primary_key=True)
+    document = models.JSONField()
+    doc_updated_at = models.DateTimeField()
+
+    class Meta:
+        verbose_name = _("документ кинопроизведения")
+        verbose_name_plural = _("документы кинопроизведений")
+        db_table = "film_work_document"
+        indexes = [models.Index(fields=["doc_updated_at", "id"], name="fwd_doc_updated_at_idx")]
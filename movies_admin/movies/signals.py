@@ -0,0 +1,35 @@
+"""Сброс кэша ответов API при изменении данных через ORM.
+
+Изменения в обход сигналов (queryset.update, bulk_create, SQL) попадают
+в ответы API по истечении CACHE_TIMEOUT."""
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from movies.cache import invalidate_film_works
+from movies.models import FilmWork, Genre, GenreFilmWork, Person, PersonFilmWork
+
+
+@receiver([post_save, post_delete], sender=FilmWork)
+def film_work_changed(sender, instance, **kwargs):
+    invalidate_film_works([instance.id])
+
+
+@receiver([post_save, post_delete], sender=PersonFilmWork)
+@receiver([post_save, post_delete], sender=GenreFilmWork)
+def link_changed(sender, instance, **kwargs):
+    invalidate_film_works([instance.film_work_id])
+
+
+# удаление персоны или жанра сбрасывает кэш через каскадное удаление связей
+@receiver(post_save, sender=Person)
+def person_changed(sender, instance, **kwargs):
+    invalidate_film_works(
+        PersonFilmWork.objects.filter(person_id=instance.id).values_list("film_work_id", flat=True)
+    )
+
+
+@receiver(post_save, sender=Genre)
+def genre_changed(sender, instance, **kwargs):
+    invalidate_film_works(
+        GenreFilmWork.objects.filter(genre_id=instance.id).values_list("film_work_id", flat=True)
+    )
@@ -0,0 +1,47 @@
+from asgiref.sync import async_to_sync
+from django.test import RequestFactory, SimpleTestCase
+
+from movies.api.v1 import async_views
+from movies.api.v1.views import MoviesDetailApi, MoviesListApi
+
+FILM_WORK_ID = "2b4e4e0b-8a1e-4c3f-9d9b-1f1e2a3b4c5d"
+BAD_LIST_PARAMS = {
+    "unknown field": {"fields": "title,budget"},
+    "malformed id": {"ids": f"{FILM_WORK_ID},not-a-uuid"},
+    "too many ids": {
+        "ids": ",".join(
+            f"00000000-0000-0000-0000-{i:012d}" for i in range(MoviesListApi.max_ids + 1)
+        )
+    },
+    "bad after token": {"after": "not a token!"},
+}
+
+
+class InvalidParametersTest(SimpleTestCase):
+    """Неверные параметры отклоняются до обращения к базе с ответом 400."""
+
+    def setUp(self):
+        self.factory = RequestFactory()
+
+    def test_list(self):
+        for name, params in BAD_LIST_PARAMS.items():
+            with self.subTest(name):
+                response = MoviesListApi.as_view()(self.factory.get("/api/v1/movies/", params))
+                self.assertEqual(response.status_code, 400)
+
+    def test_detail_unknown_field(self):
+        request = self.factory.get(f"/api/v1/movies/{FILM_WORK_ID}", {"fields": "budget"})
+        response = MoviesDetailApi.as_view()(request, pk=FILM_WORK_ID)
+        self.assertEqual(response.status_code, 400)
+
+    def test_async_list(self):
+        for name, params in BAD_LIST_PARAMS.items():
+            with self.subTest(name):
+                request = self.factory.get("/api/v1/movies/", params)
+                response = async_to_sync(async_views.movies_list)(request)
+                self.assertEqual(response.status_code, 400)
+
+    def test_async_detail_unknown_field(self):
+        request = self.factory.get(f"/api/v1/movies/{FILM_WORK_ID}", {"fields": "budget"})
+        response = async_to_sync(async_views.movies_detail)(request, FILM_WORK_ID)
+        self.assertEqual(response.status_code, 400)
@@ -0,0 +1,138 @@
+"""Планы запросов ETL используют индексы из 0005_etl_indexes.
+
+Запросы берутся из postgres_to_es, поэтому тест запускается только в полном
+репозитории и только на Postgres."""
+import json
+import re
+import sys
+from datetime import timedelta
+from pathlib import Path
+from unittest import skipUnless
+
+from django.db import connection
+from django.test import TestCase
+from django.utils import timezone
+
+from movies.models import (FilmWork, FilmWorkType, Genre, GenreFilmWork, Person,
+                           PersonFilmWork, Role)
+
+ETL_DIR = Path(__file__).resolve().parents[3] / "postgres_to_es"
+if ETL_DIR.is_dir():
+    sys.path.insert(0, str(ETL_DIR))
+
+try:
+    from psycopg2 import sql
+    from producers import DOCUMENT_PRODUCERS, PRODUCERS, PRODUCERS_BY_TABLE
+    from sql_queries import (get_changes_query, get_linked_film_works_query,
+                             get_movies_query)
+    from utils import MIN_UUID
+except ImportError:
+    PRODUCERS = None
+
+CHANGES_INDEXES = {
+    "film_work": "film_work_updated_at_idx",
+    "person": "person_updated_at_idx",
+    "genre": "genre_updated_at_idx",
+    "person_film_work": "pfw_updated_at_idx",
+    "genre_film_work": "gfw_updated_at_idx",
+    "film_work_document": "fwd_doc_updated_at_idx",
+}
+
+
+def get_index_conds(plan):
+    """Условия Index Cond узлов плана по именам индексов."""
+    conds = {}
+    if "Index Name" in plan:
+        conds.setdefault(plan["Index Name"], []).append(plan.get("Index Cond", ""))
+    for child in plan.get("Plans", []):
+        for name, child_conds in get_index_conds(child).items():
+            conds.setdefault(name, []).extend(child_conds)
+    return conds
+
+
+@skipUnless(PRODUCERS is not None, "postgres_to_es недоступен")
+@skipUnless(connection.vendor == "postgresql", "нужен Postgres")
+class EtlIndexesTest(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        genres = Genre.objects.bulk_create(Genre(name=f"Жанр {i}") for i in range(20))
+        persons = Person.objects.bulk_create(
+            Person(full_name=f"Персона {i}") for i in range(200)
+        )
+        film_works = FilmWork.objects.bulk_create(
+            FilmWork(title=f"Фильм {i}", type=FilmWorkType.MOVIE) for i in range(500)
+        )
+        roles = list(Role)
+        PersonFilmWork.objects.bulk_create(
+            PersonFilmWork(
+                film_work=film_work,
+                person=persons[(i * 7 + j) % len(persons)],
+                role=roles[j % len(roles)],
+            )
+            for i, film_work in enumerate(film_works)
+            for j in range(5)
+        )
+        GenreFilmWork.objects.bulk_create(
+            GenreFilmWork(film_work=film_work, genre=genres[i % len(genres)])
+            for i, film_work in enumerate(film_works)
+        )
+        cls.film_work_ids = [str(film_work.id) for film_work in film_works[:100]]
+        cls.person_ids = [str(person.id) for person in persons[:10]]
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "ANALYZE film_work, person, genre, person_film_work, genre_film_work, "
+                "film_work_document"
+            )
+
+    def explain(self, query, params):
+        """Условия Index Cond в плане запроса по именам индексов. Последовательное
+        чтение отключено, поэтому на маленьких таблицах планировщик выбирает индекс,
+        если может; по Index Cond видно, ищет ли он по условию или только
+        читает индекс целиком ради сортировки."""
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+            if isinstance(query, str):
+                query = sql.SQL(query)
+            cursor.execute(
+                (sql.SQL("EXPLAIN (FORMAT JSON) ") + query).as_string(cursor.connection),
+                params,
+            )
+            plan = cursor.fetchone()[0]
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return get_index_conds(plan[0]["Plan"])
+
+    def assertIndexCond(self, conds, index_name, pattern):
+        self.assertIn(index_name, conds)
+        self.assertTrue(
+            any(re.search(pattern, cond) for cond in conds[index_name]),
+            f"{index_name}: нет Index Cond {pattern!r} в {conds[index_name]}",
+        )
+
+    def test_changes_queries_use_updated_at_indexes(self):
+        position = (timezone.now() - timedelta(days=1), MIN_UUID)
+        for producer in PRODUCERS + DOCUMENT_PRODUCERS:
+            with self.subTest(table=producer.table):
+                conds = self.explain(get_changes_query(producer), (*position, 100))
+                self.assertIndexCond(
+                    conds,
+                    CHANGES_INDEXES[producer.table],
+                    rf"ROW\((\w+\.)?{producer.updated_at_column}, (\w+\.)?id\) > ROW\(",
+                )
+
+    def test_linked_film_works_query_uses_index(self):
+        conds = self.explain(
+            get_linked_film_works_query(PRODUCERS_BY_TABLE["person"]), (self.person_ids,)
+        )
+        self.assertTrue(
+            any(
+                re.search(r"(\w+\.)?person_id = ANY", cond)
+                for index_conds in conds.values()
+                for cond in index_conds
+            ),
+            conds,
+        )
+
+    def test_enrichment_query_uses_film_work_role_index(self):
+        conds = self.explain(get_movies_query(), (self.film_work_ids,))
+        self.assertIndexCond(conds, "pfw_film_work_role_idx", r"(\w+\.)?film_work_id = ")
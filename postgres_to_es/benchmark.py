@@ -0,0 +1,230 @@
+"""Замер пропускной способности ETL.
+
+Заполняет базу сгенерированным каталогом (при --seed), запускает ETL против
+локальных Postgres и Redis (или fakeredis) и встроенной заглушки /_bulk вместо
+elastic search и выводит результат в JSON: документы и байты в секунду и время
+по стадиям extract, transform, serialize и load."""
+import argparse
+import json
+import os
+import sys
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from threading import Lock, Thread
+
+import stats
+from etl import (DOCUMENT_SOURCE, ES_CHUNK_SIZE, ES_COMPRESS, ES_MAX_BYTES,
+                 ES_MAX_IN_FLIGHT, FAST_TRANSFORM, ITERSIZE, PARTIAL_UPDATES,
+                 STREAM_MODE, get_db, get_es_loader, get_etl, get_redis)
+from loggers import logger
+from utils import get_uuid_partitions
+
+# id выводятся из номера строки, а setseed задаёт выбор персон и жанров,
+# поэтому при одинаковых параметрах каталог, партиции и страницы совпадают
+SEED_QUERIES = (
+    "select setseed(%(seed)s)",
+    "truncate film_work, person, genre, person_film_work, genre_film_work, "
+    "tombstone, film_work_document",
+    """
+    insert into genre (id, name, description, created_at, updated_at)
+    select md5('genre ' || i)::uuid, 'Genre ' || i, '', now(), now()
+    from generate_series(1, %(genres)s) i
+    """,
+    """
+    insert into person (id, full_name, created_at, updated_at)
+    select md5('person ' || i)::uuid, 'Person ' || i, now(), now()
+    from generate_series(1, %(persons)s) i
+    """,
+    """
+    insert into film_work (id, title, description, creation_date, certificate,
+                           file_path, rating, type, created_at, updated_at)
+    select md5('film work ' || i)::uuid, 'Film work ' || i, repeat('Description ' || i || '. ', 20),
+           date '1950-01-01' + i %% 25000, '', '', round((random() * 10)::numeric, 1),
+           case when i %% 5 = 0 then 'serial' else 'movie' end, now(), now()
+    from generate_series(1, %(film_works)s) i
+    """,
+    """
+    insert into person_film_work (id, film_work_id, person_id, role, created_at, updated_at)
+    select md5('person film work ' || fw.id || ' ' || n)::uuid, fw.id,
+           p.ids[1 + floor(random() * array_length(p.ids, 1))::int],
+           (array['producer', 'actor', 'screenwriter'])[1 + n %% 3], now(), now()
+    from (select id from film_work order by id) fw
+    cross join generate_series(1, %(persons_per_film_work)s) n
+    cross join (select array_agg(id order by id) ids from person) p
+    """,
+    """
+    insert into genre_film_work (id, film_work_id, genre_id, created_at, updated_at)
+    select md5('genre film work ' || fw.id || ' ' || n)::uuid, fw.id,
+           g.ids[1 + floor(random() * array_length(g.ids, 1))::int], now(), now()
+    from (select id from film_work order by id) fw
+    cross join generate_series(1, %(genres_per_film_work)s) n
+    cross join (select array_agg(id order by id) ids from genre) g
+    """,
+    "analyze film_work, person, genre, person_film_work, genre_film_work, film_work_document",
+)
+
+
+def seed(db, params):
+    """Заменяет содержимое таблиц сгенерированным каталогом."""
+    logger.info("Заполнение базы: %s кинопроизведений", params["film_works"])
+    started = time.perf_counter()
+    for query in SEED_QUERIES:
+        db.cursor.execute(query, params)
+    db.commit()
+    return time.perf_counter() - started
+
+
+class BulkHandler(BaseHTTPRequestHandler):
+    """Заглушка elastic search: принимает любой /_bulk без ошибок."""
+
+    protocol_version = "HTTP/1.1"
+    response = b'{"took":0,"errors":false,"items":[]}'
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.server.delay:
+            time.sleep(self.server.delay)
+        with self.server.lock:
+            self.server.requests += 1
+            self.server.bytes += len(body)
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(self.response)))
+        self.end_headers()
+        self.wfile.write(self.response)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def start_stub_es(delay=0.0):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), BulkHandler)
+    server.daemon_threads = True
+    server.lock = Lock()
+    server.requests = 0
+    server.bytes = 0
+    server.delay = delay
+    Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+
+def get_benchmark_redis(fake, redis_db):
+    if fake:
+        import fakeredis
+
+        return fakeredis.FakeRedis()
+    redis_client = get_redis(redis_db)
+    redis_client.flushdb()
+    return redis_client
+
+
+def run(args):
+    db = get_db(args.db_name)
+    seed_seconds = None
+    if args.seed:
+        seed_seconds = seed(
+            db,
+            {
+                "seed": args.random_seed,
+                "film_works": args.film_works,
+                "persons": args.persons,
+                "genres": args.genres,
+                "persons_per_film_work": args.persons_per_film_work,
+                "genres_per_film_work": args.genres_per_film_work,
+            },
+        )
+    server = start_stub_es(args.es_delay / 1000)
+    redis_client = get_benchmark_redis(args.fake_redis, args.redis_db)
+    es_loader = get_es_loader(
+        redis_client, url=f"http://{server.server_address[0]}:{server.server_address[1]}"
+    )
+    try:
+        etl = get_etl(db, es_loader, redis_client)
+        before = stats.snapshot()
+        started = time.perf_counter()
+        if args.mode == "reindex":
+            _, first_id, last_id = next(get_uuid_partitions(1))
+            etl.reindex(0, first_id, last_id)
+        else:
+            etl.drain()
+        es_loader.flush()
+        seconds = time.perf_counter() - started
+    finally:
+        db.close()
+        es_loader.close()
+        server.shutdown()
+    after = stats.snapshot()
+    rows = after["documents"] - before["documents"]
+    return {
+        "mode": args.mode,
+        "seed_seconds": seed_seconds,
+        "rows": int(rows),
+        "seconds": seconds,
+        "rows_per_second": rows / seconds if seconds else None,
+        "bytes": server.bytes,
+        "bytes_per_second": server.bytes / seconds if seconds else None,
+        "bulk_requests": server.requests,
+        "stages": {
+            stage: after["seconds"][stage] - before["seconds"][stage] for stage in stats.STAGES
+        },
+        "settings": {
+            "film_works": args.film_works if args.seed else None,
+            "persons_per_film_work": args.persons_per_film_work,
+            "genres_per_film_work": args.genres_per_film_work,
+            "es_delay_ms": args.es_delay,
+            "stream_mode": STREAM_MODE,
+            "itersize": ITERSIZE,
+            "partial_updates": PARTIAL_UPDATES,
+            "fast_transform": FAST_TRANSFORM,
+            "document_source": DOCUMENT_SOURCE,
+            "es_chunk_size": ES_CHUNK_SIZE,
+            "es_max_bytes": ES_MAX_BYTES,
+            "es_max_in_flight": ES_MAX_IN_FLIGHT,
+            "es_compress": ES_COMPRESS,
+        },
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument(
+        "--mode",
+        choices=("reindex", "incremental"),
+        default="reindex",
+        help="reindex — загрузка всех кинопроизведений одним проходом, "
+        "incremental — обычный режим ETL с нулевых позиций до обработки всех изменений",
+    )
+    parser.add_argument(
+        "--seed",
+        action="store_true",
+        help="перед замером очистить таблицы и заполнить их сгенерированными данными",
+    )
+    parser.add_argument("--film-works", type=int, default=10000)
+    parser.add_argument("--persons", type=int, default=5000)
+    parser.add_argument("--genres", type=int, default=30)
+    parser.add_argument("--persons-per-film-work", type=int, default=5)
+    parser.add_argument("--genres-per-film-work", type=int, default=2)
+    parser.add_argument("--random-seed", type=float, default=0.5)
+    parser.add_argument(
+        "--es-delay", type=float, default=0, help="задержка ответа заглушки /_bulk, мс"
+    )
+    parser.add_argument("--fake-redis", action="store_true", help="использовать fakeredis")
+    parser.add_argument(
+        "--redis-db", type=int, default=15, help="номер базы Redis, очищается перед замером"
+    )
+    parser.add_argument(
+        "--db-name",
+        default=os.environ.get("BENCHMARK_DB_NAME"),
+        help="отдельная база для замера (BENCHMARK_DB_NAME), таблицы которой "
+        "очищаются при --seed; рабочая база DB_NAME не допускается",
+    )
+    parser.add_argument("--output", help="файл для результата вместо stdout")
+    args = parser.parse_args()
+    if not args.db_name or args.db_name == os.environ.get("DB_NAME"):
+        parser.error("нужна отдельная база для замера: --db-name или BENCHMARK_DB_NAME")
+    result = json.dumps(run(args), indent=2)
+    if args.output:
+        with open(args.output, "w") as output:
+            output.write(result + "\n")
+    else:
+        sys.stdout.write(result + "\n")
@@ -0,0 +1,163 @@
+import json
+import select
+import time
+
+from psycopg2 import errors
+
+from loggers import logger
+from producers import PRODUCERS
+from sql_queries import get_linked_film_works_query
+from utils import capture_tombstones
+
+TABLES = ("film_work", "person", "genre", "person_film_work", "genre_film_work")
+LINKED_PRODUCERS = {producer.table: producer for producer in PRODUCERS if producer.link_table}
+
+
+class CDC:
+    """Источник изменений из слота логической репликации с плагином wal2json.
+
+    Изменения строк пяти таблиц сводятся к id затронутых кинопроизведений,
+    которые загружаются через обычный конвейер ETL, а удалённые кинопроизведения
+    удаляются из индекса. Позиция в WAL (LSN) хранится в Redis и подтверждается
+    серверу только после загрузки пачки в elastic search."""
+
+    def __init__(
+        self,
+        db,
+        etl,
+        es_loader,
+        redis_client,
+        slot_name="etl_slot",
+        batch_size=1000,
+        debounce=0.2,
+        keepalive=10,
+    ):
+        self.db = db
+        self.etl = etl
+        self.es_loader = es_loader
+        self.redis_client = redis_client
+        self.slot_name = slot_name
+        self.batch_size = batch_size
+        self.debounce = debounce
+        self.keepalive = keepalive
+        self.film_works = {}
+        self.linked = {table: set() for table in LINKED_PRODUCERS}
+        self.changes = 0
+        self.first_change_at = None
+        self.in_transaction = False
+        self.lsn = None
+
+    def start(self):
+        cur = self.db.replication_cursor()
+        try:
+            cur.create_replication_slot(self.slot_name, output_plugin="wal2json")
+            logger.info("Создан слот репликации %s", self.slot_name)
+        except errors.DuplicateObject:
+            pass
+        lsn = self.redis_client.get("cdc_lsn")
+        cur.start_replication(
+            slot_name=self.slot_name,
+            decode=True,
+            start_lsn=int(lsn) if lsn else 0,
+            options={
+                "format-version": "2",
+                "add-tables": ",".join(f"public.{table}" for table in TABLES),
+            },
+        )
+        return cur
+
+    def __call__(self):
+        cur = self.start()
+        try:
+            while True:
+                message = cur.read_message()
+                if message is not None:
+                    self.handle(cur, message)
+                    continue
+                if (
+                    self.changes
+                    and not self.in_transaction
+                    and time.monotonic() - self.first_change_at >= self.debounce
+                ):
+                    self.flush(cur)
+                    continue
+                timeout = self.debounce if self.changes else self.keepalive
+                if select.select([cur], [], [], timeout) == ([], [], []):
+                    cur.send_feedback()
+        finally:
+            cur.connection.close()
+
+    def handle(self, cur, message):
+        change = json.loads(message.payload)
+        action = change["action"]
+        if action == "B":
+            self.in_transaction = True
+            return
+        if action == "C":
+            self.in_transaction = False
+            self.lsn = message.data_start
+            if self.changes >= self.batch_size:
+                self.flush(cur)
+            elif not self.changes:
+                # транзакции без изменений пяти таблиц тоже подтверждаются,
+                # иначе слот удерживает WAL до следующего изменения
+                self.confirm(cur)
+            return
+        if action not in ("I", "U", "D"):
+            return
+        if not self.changes:
+            self.first_change_at = time.monotonic()
+        self.changes += 1
+        table = change["table"]
+        rows = [
+            {column["name"]: column["value"] for column in change[key]}
+            for key in ("columns", "identity")
+            if change.get(key)
+        ]
+        if table == "film_work":
+            self.film_works[rows[0]["id"]] = action != "D"
+        elif table in LINKED_PRODUCERS:
+            if action != "D":
+                self.linked[table].add(rows[0]["id"])
+        else:
+            for row in rows:
+                if "film_work_id" in row:
+                    self.film_works.setdefault(row["film_work_id"], True)
+
+    def flush(self, cur):
+        """Загружает накопленные изменения и подтверждает позицию в WAL."""
+        with self.db.client_cursor() as db_cur:
+            for table, ids in self.linked.items():
+                if not ids:
+                    continue
+                producer = LINKED_PRODUCERS[table]
+                db_cur.execute(get_linked_film_works_query(producer), (list(ids),))
+                for row in db_cur:
+                    self.film_works.setdefault(row["film_work_id"], True)
+            deleted = [id_ for id_, exists in self.film_works.items() if not exists]
+            changed = [id_ for id_, exists in self.film_works.items() if exists]
+            logger.info(
+                "Изменений в WAL: %s, кинопроизведений обновлено: %s, удалено: %s",
+                self.changes,
+                len(changed),
+                len(deleted),
+            )
+            capture_tombstones(
+                self.redis_client,
+                [{"table_name": "film_work", "film_work_id": id_} for id_ in deleted],
+            )
+            for film_work_id in deleted:
+                self.es_loader.delete(film_work_id)
+            self.etl.load_film_works(db_cur, changed, self.etl.pipeline())
+        self.es_loader.flush()
+        self.db.commit()
+        self.etl.drain_tombstones()
+        self.confirm(cur)
+        self.film_works = {}
+        self.linked = {table: set() for table in LINKED_PRODUCERS}
+        self.changes = 0
+
+    def confirm(self, cur):
+        """Сохраняет позицию в WAL и подтверждает её серверу."""
+        self.redis_client.set("cdc_lsn", self.lsn)
+        cur.send_feedback(flush_lsn=self.lsn)
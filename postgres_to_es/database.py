@@ -1,6 +1,9 @@
+import select
+import time
+
 import psycopg2
-from psycopg2 import OperationalError
-from psycopg2.extras import DictCursor
+from psycopg2 import OperationalError, sql
+from psycopg2.extras import DictCursor, LogicalReplicationConnection
 
 from utils import backoff
 
@@ -12,21 +15,73 @@ class Database:
         self.password = password
         self.host = host
         self.port = int(port)
-        self.connect = self.connect()
+        self.connect = self._connect()
         self.cursor = self.connect.cursor(cursor_factory=DictCursor)
 
     @backoff(OperationalError)
-    def connect(self):
+    def _connect(self, **kwargs):
         return psycopg2.connect(
             dbname=self.name,
             user=self.user,
             password=self.password,
             host=self.host,
             port=self.port,
+            **kwargs,
         )
 
+    def reconnect_if_closed(self):
+        if self.connect.closed:
+            self.connect = self._connect()
+            self.cursor = self.connect.cursor(cursor_factory=DictCursor)
+
+    def client_cursor(self):
+        self.reconnect_if_closed()
+        return self.connect.cursor(cursor_factory=DictCursor)
+
+    def server_cursor(self, name: str, itersize: int):
+        self.reconnect_if_closed()
+        cursor = self.connect.cursor(name, cursor_factory=DictCursor)
+        cursor.itersize = itersize
+        return cursor
+
+    def listen(self, channel: str):
+        """Открывает отдельное соединение, подписанное на уведомления канала channel."""
+        connect = self._connect()
+        connect.autocommit = True
+        with connect.cursor() as cursor:
+            cursor.execute(sql.SQL("listen {}").format(sql.Identifier(channel)))
+        return connect
+
+    def replication_cursor(self):
+        """Открывает отдельное соединение логической репликации."""
+        return self._connect(connection_factory=LogicalReplicationConnection).cursor()
+
+    def commit(self):
+        if not self.connect.closed:
+            self.connect.commit()
+
     def close(self, commit=True):
         if commit:
             self.connect.commit()
         self.cursor.close()
         self.connect.close()
+
+
+def wait_notifies(connect, timeout: float, debounce: float):
+    """Ждёт уведомления не дольше timeout секунд и собирает все уведомления,
+    пришедшие в течение debounce секунд после первого.
+
+    Возвращает множество payload уведомлений (пустое, если их не было)."""
+    payloads = set()
+    wait = timeout
+    deadline = None
+    while select.select([connect], [], [], wait) != ([], [], []):
+        connect.poll()
+        while connect.notifies:
+            payloads.add(connect.notifies.pop(0).payload)
+        if deadline is None:
+            deadline = time.monotonic() + debounce
+        wait = deadline - time.monotonic()
+        if wait <= 0:
+            break
+    return payloads
@@ -0,0 +1,320 @@
+import gzip
+import json
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from itertools import accumulate
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.exceptions import ConnectionError, Timeout
+
+from loggers import logger
+from stats import BULK_BYTES, BULK_LATENCY, ES_ITEM_ERRORS, measure
+from utils import backoff, expo
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def dumps(obj) -> bytes:
+    if orjson is not None:
+        return orjson.dumps(obj)
+    return json.dumps(obj, ensure_ascii=False).encode("utf-8")
+
+
+def is_document_missing(error) -> bool:
+    """Частичное обновление документа, которого ещё нет в индексе. Это не ошибка:
+    кинопроизведение целиком загрузит producer film_work."""
+    return isinstance(error, dict) and error.get("type") == "document_missing_exception"
+
+
+class BulkBuffer:
+    """Тело запроса _bulk в формате NDJSON, собираемое в переиспользуемом буфере."""
+
+    def __init__(self):
+        self.data = bytearray()
+        self.offsets = []
+
+    def __len__(self):
+        return len(self.offsets)
+
+    @property
+    def size(self):
+        return len(self.data)
+
+    def append(self, action: bytes, source: bytes = None):
+        self.offsets.append(len(self.data))
+        self.data += action
+        self.data += b"\n"
+        if source is not None:
+            self.data += source
+            self.data += b"\n"
+
+    @staticmethod
+    def split(data: bytes, offsets):
+        """Разбивает отправленное тело запроса на строки отдельных действий."""
+        ends = offsets[1:] + [len(data)]
+        return [data[start:end] for start, end in zip(offsets, ends)]
+
+    def clear(self):
+        self.data.clear()
+        self.offsets.clear()
+
+
+class ESLoader:
+    def __init__(
+        self,
+        url,
+        index_name,
+        redis_client,
+        chunk_size=100,
+        max_bytes=10485760,
+        max_in_flight=1,
+        max_retries=5,
+        pool_size=10,
+        timeout=(5, 60),
+        compress=False,
+    ):
+        self.url = url
+        self.index_name = index_name
+        self.redis_client = redis_client
+        self.chunk_size = chunk_size
+        self.max_bytes = max_bytes
+        self.max_in_flight = max_in_flight
+        self.max_retries = max_retries
+        self.timeout = timeout
+        self.compress = compress
+        self.session = requests.Session()
+        self.session.mount(
+            self.url, HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        )
+        self.buffer = BulkBuffer()
+        self.callbacks = []
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight)
+        self.in_flight = deque()
+
+    @backoff((ConnectionError, Timeout))
+    def _post(self, data: bytes):
+        url = self.url + "/_bulk"
+        headers = {"Content-type": "application/x-ndjson"}
+        if self.compress:
+            data = gzip.compress(data, compresslevel=1)
+            headers["Content-Encoding"] = "gzip"
+        BULK_BYTES.observe(len(data))
+        with BULK_LATENCY.time():
+            return self.session.post(url, data=data, headers=headers, timeout=self.timeout)
+
+    def bulk(self, data: bytes, offsets):
+        """Отправляет данные в elastic search. Документы, не принятые из-за перегрузки
+        (429, 5xx), отправляются повторно, остальные ошибки попадают в dead_letter,
+        кроме update ещё не загруженного документа (document_missing_exception).
+        Если отклонён весь запрос (400, 401, 413 и т. п.), в dead_letter попадают
+        все его документы с кодом и телом ответа."""
+        with measure("load"):
+            self._bulk(data, offsets)
+
+    def _bulk(self, data: bytes, offsets):
+        delays = expo(2, 2, 10)
+        logger.info("Отправка данных в elastic search (%s байт)", len(data))
+        for attempt in range(self.max_retries + 1):
+            response = self._post(data)
+            if response.status_code in RETRY_STATUSES:
+                ES_ITEM_ERRORS.labels(response.status_code).inc(len(offsets))
+                retry = BulkBuffer.split(data, offsets)
+            elif not response.ok:
+                ES_ITEM_ERRORS.labels(response.status_code).inc(len(offsets))
+                logger.error(
+                    "Elastic search отклонил запрос: %s %s",
+                    response.status_code,
+                    response.text[:500],
+                )
+                self.dead_letter(
+                    [
+                        (item, response.status_code, response.text)
+                        for item in BulkBuffer.split(data, offsets)
+                    ]
+                )
+                return
+            else:
+                res = response.json()
+                if not res.get("errors"):
+                    logger.info("Данные загружены")
+                    return
+                retry = []
+                failed = []
+                missing = 0
+                for item, result in zip(BulkBuffer.split(data, offsets), res["items"]):
+                    action, result = next(iter(result.items()))
+                    if "error" not in result:
+                        continue
+                    if action == "update" and is_document_missing(result["error"]):
+                        missing += 1
+                        continue
+                    ES_ITEM_ERRORS.labels(result["status"]).inc()
+                    if result["status"] in RETRY_STATUSES:
+                        retry.append(item)
+                    else:
+                        failed.append((item, result["status"], result["error"]))
+                if missing:
+                    logger.info(
+                        "Частичных обновлений ещё не загруженных документов: %s", missing
+                    )
+                self.dead_letter(failed)
+                if not retry:
+                    return
+            if attempt == self.max_retries:
+                self.dead_letter(
+                    [(item, response.status_code, "retries exceeded") for item in retry]
+                )
+                return
+            delay = next(delays)
+            logger.warning(
+                "Elastic search не принял %s документов, повтор через %ss", len(retry), delay
+            )
+            time.sleep(delay)
+            offsets = list(accumulate(len(item) for item in retry[:-1]))
+            offsets.insert(0, 0)
+            data = b"".join(retry)
+
+    def get_indices(self, pattern):
+        response = self.session.get(
+            f"{self.url}/_cat/indices/{pattern}",
+            params={"h": "index", "format": "json"},
+            timeout=self.timeout,
+        )
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return [row["index"] for row in response.json()]
+
+    def get_alias_indices(self, alias):
+        response = self.session.get(f"{self.url}/_alias/{alias}", timeout=self.timeout)
+        if response.status_code == 404:
+            return []
+        response.raise_for_status()
+        return list(response.json())
+
+    def create_index(self, name, body):
+        response = self.session.put(f"{self.url}/{name}", json=body, timeout=self.timeout)
+        response.raise_for_status()
+
+    def put_settings(self, name, settings):
+        response = self.session.put(
+            f"{self.url}/{name}/_settings", json={"index": settings}, timeout=self.timeout
+        )
+        response.raise_for_status()
+
+    def forcemerge(self, name):
+        response = self.session.post(
+            f"{self.url}/{name}/_forcemerge", params={"max_num_segments": 1}, timeout=None
+        )
+        response.raise_for_status()
+
+    def swap_alias(self, alias, index_name):
+        """Атомарно переключает alias на index_name. Если alias был обычным индексом,
+        этот индекс удаляется в том же запросе."""
+        old_indices = self.get_alias_indices(alias)
+        actions = [{"remove": {"index": old, "alias": alias}} for old in old_indices]
+        if not old_indices and self.session.head(
+            f"{self.url}/{alias}", timeout=self.timeout
+        ).ok:
+            actions.append({"remove_index": {"index": alias}})
+        actions.append({"add": {"index": index_name, "alias": alias}})
+        response = self.session.post(
+            f"{self.url}/_aliases", json={"actions": actions}, timeout=self.timeout
+        )
+        response.raise_for_status()
+        return [old for old in old_indices if old != index_name]
+
+    def dead_letter(self, failed):
+        if not failed:
+            return
+        logger.error("При отправке возникли ошибки, документов в dead_letter: %s", len(failed))
+        self.redis_client.rpush(
+            "dead_letter",
+            *(
+                json.dumps(
+                    {"status": status, "error": error, "item": item.decode("utf-8")},
+                    ensure_ascii=False,
+                )
+                for item, status, error in failed
+            ),
+        )
+
+    def add(self, document, fields=None):
+        with measure("serialize"):
+            rendered = self._render(document, fields)
+        self._append(*rendered)
+
+    def delete(self, film_work_id):
+        self._append(dumps({"delete": {"_index": self.index_name, "_id": film_work_id}}))
+
+    def _append(self, action, source=None):
+        """Добавляет действие в буфер, предварительно отправив буфер,
+        если с этим действием он превысит chunk_size действий или max_bytes байт."""
+        size = len(action) + 1 + (len(source) + 1 if source is not None else 0)
+        if self.buffer and (
+            len(self.buffer) >= self.chunk_size or self.buffer.size + size > self.max_bytes
+        ):
+            self.submit()
+        self.buffer.append(action, source)
+
+    def after_sent(self, callback):
+        """Вызывает callback, когда elastic search подтвердит все уже добавленные
+        действия и все отправленные до них запросы. Вызов происходит в том же
+        потоке при отправке следующего буфера или в flush."""
+        if self.buffer:
+            self.callbacks.append(callback)
+        elif self.in_flight:
+            self.in_flight[-1][1].append(callback)
+        else:
+            callback()
+
+    def submit(self):
+        """Отправляет буфер в фоне. Если в работе уже max_in_flight запросов,
+        ждёт завершения самого старого из них."""
+        if not self.buffer:
+            return
+        data = bytes(self.buffer.data)
+        offsets = list(self.buffer.offsets)
+        callbacks = self.callbacks
+        self.buffer.clear()
+        self.callbacks = []
+        while self.in_flight and self.in_flight[0][0].done():
+            self._complete()
+        with measure("load_wait"):
+            while len(self.in_flight) >= self.max_in_flight:
+                self._complete()
+        self.in_flight.append((self.executor.submit(self.bulk, data, offsets), callbacks))
+
+    def flush(self):
+        """Отправляет буфер и ждёт подтверждения всех запросов в работе."""
+        self.submit()
+        with measure("load_wait"):
+            while self.in_flight:
+                self._complete()
+
+    def _complete(self):
+        """Дожидается самого старого запроса и вызывает привязанные к нему callback.
+        Запросы завершаются по порядку, поэтому к этому моменту подтверждены
+        и все более ранние."""
+        future, callbacks = self.in_flight.popleft()
+        future.result()
+        for callback in callbacks:
+            callback()
+
+    def close(self):
+        self.executor.shutdown()
+        self.session.close()
+
+    def _render(self, document, fields=None):
+        meta = {"_index": self.index_name, "_id": document["id"]}
+        if fields:
+            doc = {key: value for key, value in document.items() if key in fields}
+            return dumps({"update": meta}), dumps({"doc": doc})
+        return dumps({"index": meta}), dumps(document)
@@ -1,134 +1,554 @@
+import argparse
 import json
 import os
-import pickle
-import sched
-import time
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor, as_completed
 
 import redis
-import requests
 from dotenv import load_dotenv
 from psycopg2 import InterfaceError, OperationalError
-from requests.exceptions import ConnectionError
 
-from database import Database
+from cdc import CDC
+from database import Database, wait_notifies
+from elastic import ESLoader
 from loggers import logger
-from schemas import FilmWork
-from sql_queries import get_movies_query
-from utils import backoff, coroutine, get_update_time
+from producers import DOCUMENT_PRODUCERS, PRODUCERS, PRODUCERS_BY_TABLE
+from schemas import FilmWork, get_document
+from sql_queries import (get_changes_query, get_delete_tombstones_query,
+                         get_documents_query, get_film_works_range_query,
+                         get_linked_film_works_query, get_movies_query,
+                         get_tombstones_query)
+from stats import DOCUMENTS, EXTRACTED_ROWS, measure, set_lag, start_exporter
+from utils import (MIN_UUID, backoff, capture_tombstones, chunks,
+                   clear_journal, coroutine, get_captured_tombstones,
+                   get_generation, get_journal, get_position,
+                   get_uuid_partitions, remove_captured_tombstones,
+                   save_journal, set_position, start_tombstone_capture,
+                   stop_tombstone_capture, write_positions)
 
 load_dotenv(".env")
-schedule = sched.scheduler(time.time, time.sleep)
-TIME_REPEAT = int(os.environ.get("TIME_REPEAT")) or 60
-
-
-class ESLoader:
-    def __init__(self, url, index_name, redis_client):
-        self.url = url
-        self.index_name = index_name
-        self.redis_client = redis_client
-
-    @backoff(ConnectionError)
-    def bulk(self, data):
-        url = self.url + "/_bulk"
-        headers = {"Content-type": "application/json"}
-        logger.info("Отправка данных в elastic search")
-        res = requests.post(url, data=data.encode("utf-8"), headers=headers).json()
-        if res.get("errors"):
-            logger.error("При отправке возникли ошибки")
-        else:
-            logger.info("Данные загружены")
-
-    def load_to_es(self, film_works, update_redis_data=True):
-        if update_redis_data:
-            self.redis_client.set("data", pickle.dumps(film_works))
-        data = self._precess_data(film_works)
-        self.bulk(data)
-        self.update_redis_info(film_works[-1].update_time.isoformat())
-
-    def _precess_data(self, film_works):
-        data = ""
-        for film_work in film_works:
-            data += (
-                json.dumps({"index": {"_index": self.index_name, "_id": film_work.id}})
-                + "\n"
-            )
-            data += film_work.json(ensure_ascii=False, exclude={"update_time"}) + "\n"
-        return data
-
-    def update_redis_info(self, update_time):
-        self.redis_client.set("data", "")
-        self.redis_client.set("update_time", update_time)
+TIME_REPEAT = int(os.environ.get("TIME_REPEAT", 60))
+NOTIFY_CHANNEL = "etl_changes"
+NOTIFY_DEBOUNCE = float(os.environ.get("NOTIFY_DEBOUNCE", 0.2))
+DOCUMENT_SOURCE = os.environ.get("DOCUMENT_SOURCE", "0") == "1"
+CDC_SLOT = os.environ.get("CDC_SLOT", "etl_slot")
+CDC_BATCH_SIZE = int(os.environ.get("CDC_BATCH_SIZE", 1000))
+STREAM_MODE = os.environ.get("STREAM_MODE", "0") == "1"
+ITERSIZE = int(os.environ.get("ITERSIZE", 1000))
+PARTIAL_UPDATES = os.environ.get("PARTIAL_UPDATES", "0") == "1"
+FAST_TRANSFORM = os.environ.get("FAST_TRANSFORM", "0") == "1"
+ES_CHUNK_SIZE = int(os.environ.get("ES_CHUNK_SIZE", 100))
+ES_MAX_BYTES = int(os.environ.get("ES_MAX_BYTES", 10485760))
+ES_MAX_IN_FLIGHT = int(os.environ.get("ES_MAX_IN_FLIGHT", 1))
+ES_MAX_RETRIES = int(os.environ.get("ES_MAX_RETRIES", 5))
+ES_POOL_SIZE = int(os.environ.get("ES_POOL_SIZE", 10))
+ES_CONNECT_TIMEOUT = float(os.environ.get("ES_CONNECT_TIMEOUT", 5))
+ES_READ_TIMEOUT = float(os.environ.get("ES_READ_TIMEOUT", 60))
+ES_COMPRESS = os.environ.get("ES_COMPRESS", "0") == "1"
+ES_INDEX = "movies"
+METRICS_PORT = int(os.environ.get("METRICS_PORT", 9108))
+METRICS_ADDR = os.environ.get("METRICS_ADDR", "127.0.0.1")
+ES_SCHEMA_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "es_schema.json")
 
 
 class ETL:
     def __init__(
-        self, db, es_loader, redis_client, postgres_limit=100, es_chunk_size=100
+        self,
+        db,
+        es_loader,
+        redis_client,
+        producers=PRODUCERS,
+        postgres_limit=100,
+        stream=False,
+        itersize=1000,
+        partial_updates=False,
+        fast_transform=False,
+        documents=False,
     ):
         self.es_loader = es_loader
         self.db = db
         self.redis_client = redis_client
+        self.producers = producers
         self.postgres_limit = postgres_limit
-        self.es_chunk_size = es_chunk_size
+        self.stream = stream
+        self.itersize = itersize
+        self.partial_updates = partial_updates
+        self.fast_transform = fast_transform
+        self.movies_query = get_documents_query() if documents else get_movies_query()
 
-    @backoff((OperationalError, InterfaceError))
-    def extract(self, target):
-        cur = self.db.cursor
-        logger.info("Извлечение данных из базы")
-        cur.execute(
-            get_movies_query(),
-            (get_update_time(self.redis_client), self.postgres_limit),
-        )
-        logger.info("Обработка данных")
-        for row in cur:
-            target.send(row)
+    def extract(self, producer, target):
+        """Передаёт в target пачки изменённых с прошлого запуска записей таблицы producer.
+        Возвращает True, если выборка ограничена postgres_limit и изменения могли остаться."""
+        logger.info("Поиск изменений в таблице %s", producer.table)
+        position = get_position(self.redis_client, producer.table)
+        if self.stream:
+            cur = self.db.server_cursor(f"etl_{producer.table}", self.itersize)
+            cur.execute(get_changes_query(producer, limit=False), position)
+            size = self.itersize
+        else:
+            cur = self.db.client_cursor()
+            cur.execute(get_changes_query(producer), (*position, self.postgres_limit))
+            size = self.postgres_limit
+        found = full = False
+        try:
+            while True:
+                with measure("extract"):
+                    rows = cur.fetchmany(size)
+                if not rows:
+                    break
+                found = True
+                full = not self.stream and len(rows) == self.postgres_limit
+                EXTRACTED_ROWS.labels(producer.table).inc(len(rows))
+                target.send(rows)
+        finally:
+            cur.close()
+        if not found:
+            set_lag(producer.table)
+        return full
+
+    @coroutine
+    def enrich(self, producer, target, generation):
+        """Собирает документы затронутых кинопроизведений и сдвигает позицию producer
+        после того, как они загружены в elastic search.
+
+        Следующая пачка читается, не дожидаясь ответа elastic search на предыдущую:
+        позиция пачки сдвигается, когда подтверждён последний запрос с её документами.
+        В журнале лежат id кинопроизведений всех ещё не подтверждённых пачек.
+        Если после чтения generation позиции сброшены полной загрузкой, позиции
+        и журнал этих пачек не сохраняются."""
+        cur = self.db.client_cursor()
+        pending = deque()
+        while rows := (yield):
+            if producer.film_work_column:
+                film_work_ids = list(dict.fromkeys(row["film_work_id"] for row in rows))
+            else:
+                with measure("extract"):
+                    cur.execute(
+                        get_linked_film_works_query(producer), ([row["id"] for row in rows],)
+                    )
+                film_work_ids = [row["film_work_id"] for row in cur]
+            logger.info(
+                "Изменений в %s: %s, затронуто кинопроизведений: %s",
+                producer.table,
+                len(rows),
+                len(film_work_ids),
+            )
+            pending.append(((rows[-1]["updated_at"], rows[-1]["id"]), film_work_ids))
+            write_positions(
+                self.redis_client,
+                generation,
+                lambda pipe: self.save_pending(pipe, producer.table, pending),
+            )
+            self.load_film_works(cur, film_work_ids, target)
+            self.es_loader.after_sent(lambda: self.confirm(producer.table, pending, generation))
+
+    @staticmethod
+    def save_pending(redis_client, table, pending):
+        film_work_ids = dict.fromkeys(id_ for _, ids in pending for id_ in ids)
+        save_journal(redis_client, table, pending[-1][0], list(film_work_ids))
+
+    def confirm(self, table, pending, generation):
+        """Сдвигает позицию таблицы после подтверждения самой старой пачки."""
+        position, _ = pending.popleft()
+
+        def write(pipe):
+            set_position(pipe, table, *position)
+            if pending:
+                self.save_pending(pipe, table, pending)
+            else:
+                clear_journal(pipe)
+
+        if write_positions(self.redis_client, generation, write):
+            set_lag(table, position[0])
+        else:
+            logger.warning("Позиции сброшены полной загрузкой, позиция %s не сохранена", table)
+
+    def load_film_works(self, cur, film_work_ids, target):
+        """Передаёт документы кинопроизведений в конвейер. Подтверждения загрузки
+        не ждёт: для этого нужен es_loader.flush() или es_loader.after_sent()."""
+        for ids in chunks(film_work_ids, self.postgres_limit):
+            with measure("extract"):
+                cur.execute(self.movies_query, (ids,))
+            for row in cur:
+                target.send(row)
 
     @coroutine
     def transform(self, target):
-        while row := (yield):
-            target.send(FilmWork(**dict(row)))
+        while True:
+            row = yield
+            with measure("transform"):
+                if self.fast_transform:
+                    document = get_document(row)
+                else:
+                    document = FilmWork(**dict(row)).dict()
+            DOCUMENTS.inc()
+            target.send(document)
 
     @coroutine
-    def load(self):
-        buf = []
-        while v := (yield):
-            buf.append(v)
-            if len(buf) == self.es_chunk_size:
-                self.es_loader.load_to_es(buf)
-                buf = []
-        if buf:
-            self.es_loader.load_to_es(buf)
-
-    def __call__(self, *args, **kwargs):
-        load = self.load()
-        transform = self.transform(load)
-        self.extract(transform)
-
-
-def main(sc=None):
-    redis_client = redis.Redis(host=os.environ.get("REDIS_HOST", "127.0.0.1"))
-    es_loader = ESLoader(
-        url=os.environ.get("ES_LOADER_URL", "http://127.0.0.1:9200"),
-        index_name="movies",
+    def load(self, fields=None):
+        while True:
+            self.es_loader.add((yield), fields)
+
+    def pipeline(self, fields=None):
+        load = self.load(fields if self.partial_updates else None)
+        return self.transform(load)
+
+    @backoff((OperationalError, InterfaceError))
+    def recover(self):
+        """Догружает пачку из журнала, если прошлый запуск не успел её загрузить."""
+        generation = get_generation(self.redis_client)
+        if not (journal := get_journal(self.redis_client)):
+            return
+        table, position, film_work_ids = journal
+        producer = PRODUCERS_BY_TABLE[table]
+        logger.info("Найдены не загруженные данные, начинаю загрузку")
+        with self.db.client_cursor() as cur:
+            self.load_film_works(cur, film_work_ids, self.pipeline(producer.fields))
+        self.es_loader.flush()
+
+        def write(pipe):
+            set_position(pipe, table, *position)
+            clear_journal(pipe)
+
+        write_positions(self.redis_client, generation, write)
+
+    def apply_tombstones(self, cur, rows):
+        """Удаляет из индекса удалённые кинопроизведения и обновляет кинопроизведения,
+        у которых удалены связи."""
+        deleted = {row["film_work_id"] for row in rows if row["table_name"] == "film_work"}
+        linked = {}
+        for row in rows:
+            if row["film_work_id"] not in deleted:
+                linked.setdefault(row["table_name"], {})[row["film_work_id"]] = None
+        logger.info(
+            "Удалено кинопроизведений: %s, кинопроизведений с удалёнными связями: %s",
+            len(deleted),
+            sum(map(len, linked.values())),
+        )
+        for film_work_id in deleted:
+            self.es_loader.delete(film_work_id)
+        for table, film_work_ids in linked.items():
+            self.load_film_works(
+                cur, list(film_work_ids), self.pipeline(PRODUCERS_BY_TABLE[table].fields)
+            )
+        self.es_loader.flush()
+
+    @backoff((OperationalError, InterfaceError))
+    def drain_tombstones(self):
+        """Применяет записи журнала удалений и удаляет их после загрузки.
+        Во время полной загрузки записи сохраняются для replay_tombstones."""
+        with self.db.client_cursor() as cur:
+            while True:
+                cur.execute(get_tombstones_query(), (self.postgres_limit,))
+                if not (rows := cur.fetchall()):
+                    break
+                capture_tombstones(self.redis_client, rows)
+                self.apply_tombstones(cur, rows)
+                cur.execute(get_delete_tombstones_query(), ([row["id"] for row in rows],))
+                self.db.commit()
+
+    @backoff((OperationalError, InterfaceError))
+    def replay_tombstones(self):
+        """Повторяет удаления, обработанные во время полной загрузки: документ,
+        прочитанный до удаления, мог попасть в индекс уже после него."""
+        with self.db.client_cursor() as cur:
+            while rows := get_captured_tombstones(self.redis_client, self.postgres_limit):
+                self.apply_tombstones(cur, rows)
+                remove_captured_tombstones(self.redis_client, len(rows))
+
+    @backoff((OperationalError, InterfaceError))
+    def process(self, producer):
+        """Загружает изменения таблицы producer. Журнал один на все таблицы,
+        поэтому перед следующей таблицей все пачки этой должны быть подтверждены."""
+        # поколение читается до позиции в extract: пачки, прочитанные от позиции
+        # до сброса, не перезапишут сброшенную позицию
+        generation = get_generation(self.redis_client)
+        enrich = self.enrich(producer, self.pipeline(producer.fields), generation)
+        try:
+            return self.extract(producer, enrich)
+        finally:
+            self.es_loader.flush()
+
+    @backoff((OperationalError, InterfaceError))
+    def reindex(self, number, first_id, last_id):
+        """Загружает все кинопроизведения с id в диапазоне [first_id, last_id]."""
+        target = self.transform(self.load())
+        cur = self.db.server_cursor(f"etl_reindex_{number}", self.itersize)
+        cur.execute(get_film_works_range_query(), (first_id, last_id))
+        loaded = 0
+        try:
+            with self.db.client_cursor() as enrich_cur:
+                while True:
+                    with measure("extract"):
+                        rows = cur.fetchmany(self.itersize)
+                    if not rows:
+                        break
+                    self.load_film_works(enrich_cur, [row["id"] for row in rows], target)
+                    loaded += len(rows)
+                    logger.info("Партиция %s: загружено %s кинопроизведений", number, loaded)
+            self.es_loader.flush()
+        finally:
+            cur.close()
+        return loaded
+
+    def __call__(self, tables=None):
+        """Один проход по таблицам. Возвращает таблицы, в которых остались
+        необработанные изменения."""
+        self.recover()
+        pending = set()
+        for producer in self.producers:
+            if tables is None or producer.table in tables:
+                if self.process(producer):
+                    pending.add(producer.table)
+        self.drain_tombstones()
+        self.db.commit()
+        return pending
+
+    def drain(self, tables=None):
+        """Повторяет проходы, пока в таблицах остаются изменения: уведомления
+        о них уже получены, и без этого остаток ждал бы TIME_REPEAT."""
+        while tables := self(tables):
+            logger.info("Остались изменения в таблицах: %s", ", ".join(sorted(tables)))
+
+
+def get_redis(db=0):
+    return redis.Redis(host=os.environ.get("REDIS_HOST", "127.0.0.1"), db=db)
+
+
+def get_es_loader(redis_client, index_name=ES_INDEX, url=None):
+    return ESLoader(
+        url=url or os.environ.get("ES_LOADER_URL", "http://127.0.0.1:9200"),
+        index_name=index_name,
         redis_client=redis_client,
+        chunk_size=ES_CHUNK_SIZE,
+        max_bytes=ES_MAX_BYTES,
+        max_in_flight=ES_MAX_IN_FLIGHT,
+        max_retries=ES_MAX_RETRIES,
+        pool_size=ES_POOL_SIZE,
+        timeout=(ES_CONNECT_TIMEOUT, ES_READ_TIMEOUT),
+        compress=ES_COMPRESS,
     )
-    db = Database(
-        name=os.environ.get("DB_NAME"),
+
+
+def get_db(name=None):
+    return Database(
+        name=name or os.environ.get("DB_NAME"),
         user=os.environ.get("DB_USER"),
         password=os.environ.get("DB_PASS"),
         host=os.environ.get("DB_HOST"),
         port=os.environ.get("DB_PORT"),
     )
+
+
+def get_etl(db, es_loader, redis_client):
+    return ETL(
+        db,
+        es_loader,
+        redis_client,
+        stream=STREAM_MODE,
+        itersize=ITERSIZE,
+        partial_updates=PARTIAL_UPDATES,
+        fast_transform=FAST_TRANSFORM,
+        producers=DOCUMENT_PRODUCERS if DOCUMENT_SOURCE else PRODUCERS,
+        documents=DOCUMENT_SOURCE,
+    )
+
+
+def main():
+    """Постоянно работающий процесс ETL.
+
+    Соединения открываются один раз. Запуск происходит по уведомлениям триггеров
+    из канала NOTIFY_CHANNEL (только для изменившихся таблиц), а если уведомлений
+    нет TIME_REPEAT секунд — для всех таблиц."""
+    if METRICS_PORT:
+        start_exporter(METRICS_PORT, METRICS_ADDR)
+    redis_client = get_redis()
+    es_loader = get_es_loader(redis_client)
+    db = get_db()
+    listener = db.listen(NOTIFY_CHANNEL)
+    etl = get_etl(db, es_loader, redis_client)
+    tables = None
+    try:
+        while True:
+            etl.drain(tables)
+            try:
+                tables = wait_notifies(listener, TIME_REPEAT, NOTIFY_DEBOUNCE) or None
+            except (OperationalError, InterfaceError):
+                logger.error("Потеряно соединение для уведомлений, переподключение")
+                listener.close()
+                listener = db.listen(NOTIFY_CHANNEL)
+                tables = None
+    finally:
+        listener.close()
+        db.close()
+        es_loader.close()
+
+
+def cdc_main():
+    """Загрузка изменений из слота логической репликации вместо опроса таблиц."""
+    if METRICS_PORT:
+        start_exporter(METRICS_PORT, METRICS_ADDR)
+    redis_client = get_redis()
+    es_loader = get_es_loader(redis_client)
+    db = get_db()
+    try:
+        CDC(
+            db,
+            get_etl(db, es_loader, redis_client),
+            es_loader,
+            redis_client,
+            slot_name=CDC_SLOT,
+            batch_size=CDC_BATCH_SIZE,
+            debounce=NOTIFY_DEBOUNCE,
+        )()
+    finally:
+        db.close()
+        es_loader.close()
+
+
+def reindex_partition(partition, index_name):
+    number, first_id, last_id = partition
+    redis_client = get_redis()
+    es_loader = get_es_loader(redis_client, index_name)
+    db = get_db()
+    try:
+        return get_etl(db, es_loader, redis_client).reindex(number, first_id, last_id)
+    finally:
+        db.close()
+        es_loader.close()
+
+
+def reindex_all(workers, index_name=ES_INDEX):
+    """Загружает все кинопроизведения в index_name в workers процессах,
+    каждый со своим диапазоном id. Возвращает время начала загрузки."""
+    db = get_db()
+    try:
+        db.cursor.execute("select now()")
+        started_at = db.cursor.fetchone()[0]
+    finally:
+        db.close()
+    logger.info("Полная загрузка в индекс %s, процессов: %s", index_name, workers)
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(reindex_partition, partition, index_name): partition
+            for partition in get_uuid_partitions(workers)
+        }
+        total = 0
+        for future in as_completed(futures):
+            loaded = future.result()
+            total += loaded
+            logger.info("Партиция %s завершена: %s кинопроизведений", futures[future][0], loaded)
+    logger.info("Полная загрузка завершена: %s кинопроизведений", total)
+    return started_at
+
+
+def reset_positions(redis_client, started_at):
+    """Переводит позиции всех таблиц на момент начала полной загрузки,
+    чтобы изменения, сделанные во время неё, подхватил обычный режим.
+
+    Работающий ETL может в это время загружать пачки, прочитанные от старых
+    позиций, в том числе мимо нового индекса. После сброса он не должен сдвинуть
+    позиции дальше started_at по этим пачкам: сброс увеличивает поколение
+    позиций в той же транзакции, и ETL сохраняет позиции и журнал, только
+    если поколение не изменилось с начала прохода (write_positions)."""
+    with redis_client.pipeline() as pipe:
+        pipe.incr("positions_generation")
+        for producer in PRODUCERS + DOCUMENT_PRODUCERS:
+            set_position(pipe, producer.table, started_at, MIN_UUID)
+        clear_journal(pipe)
+        pipe.execute()
+
+
+def replay_tombstones(redis_client, es_loader):
+    """Прекращает сохранять удаления и повторяет сохранённые в es_loader.index_name."""
+    stop_tombstone_capture(redis_client)
+    db = get_db()
     try:
-        etl = ETL(db, es_loader, redis_client)
-        if data := redis_client.get("data"):
-            logger.info("Найдены не загруженные данные, начинаю загрузку")
-            es_loader.load_to_es(pickle.loads(data), update_redis_data=False)
-        etl()
+        get_etl(db, es_loader, redis_client).replay_tombstones()
+        db.commit()
     finally:
         db.close()
-        schedule.enter(TIME_REPEAT, 1, main, (sc,))
+
+
+def full_reindex(workers):
+    redis_client = get_redis()
+    es_loader = get_es_loader(redis_client)
+    start_tombstone_capture(redis_client)
+    try:
+        started_at = reindex_all(workers)
+        replay_tombstones(redis_client, es_loader)
+        reset_positions(redis_client, started_at)
+    finally:
+        stop_tombstone_capture(redis_client)
+        es_loader.close()
+
+
+def rebuild(workers):
+    """Собирает новый индекс movies_vN и переключает на него alias movies.
+
+    На время загрузки у нового индекса отключены обновление и реплики,
+    поэтому поиск по текущему индексу не замедляется. Удаления, которые
+    обычный режим применил к старому индексу во время загрузки, повторяются
+    в новом после переключения alias."""
+    redis_client = get_redis()
+    es_loader = get_es_loader(redis_client)
+    try:
+        with open(ES_SCHEMA_PATH) as schema_file:
+            schema = json.load(schema_file)
+        versions = [
+            int(name.rsplit("_v", 1)[1])
+            for name in es_loader.get_indices(f"{ES_INDEX}_v*")
+            if name.rsplit("_v", 1)[1].isdigit()
+        ]
+        index_name = f"{ES_INDEX}_v{max(versions, default=0) + 1}"
+        settings = schema["settings"]
+        live_settings = {
+            "refresh_interval": settings.get("refresh_interval", "1s"),
+            "number_of_replicas": settings.get("number_of_replicas", 1),
+        }
+        schema["settings"] = {**settings, "refresh_interval": "-1", "number_of_replicas": 0}
+        logger.info("Создание индекса %s", index_name)
+        es_loader.create_index(index_name, schema)
+
+        start_tombstone_capture(redis_client)
+        started_at = reindex_all(workers, index_name)
+
+        es_loader.put_settings(index_name, live_settings)
+        logger.info("Слияние сегментов индекса %s", index_name)
+        es_loader.forcemerge(index_name)
+        old_indices = es_loader.swap_alias(ES_INDEX, index_name)
+        replay_tombstones(redis_client, es_loader)
+        reset_positions(redis_client, started_at)
+        logger.info("Alias %s переключён на %s", ES_INDEX, index_name)
+        if old_indices:
+            logger.info("Предыдущие индексы можно удалить: %s", ", ".join(old_indices))
+    finally:
+        stop_tombstone_capture(redis_client)
+        es_loader.close()
 
 
 if __name__ == "__main__":
-    schedule.enter(0, 1, main, (schedule,))
-    schedule.run()
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--full-reindex", action="store_true", help="полная перезагрузка индекса"
+    )
+    parser.add_argument(
+        "--rebuild",
+        action="store_true",
+        help="сборка нового индекса movies_vN и переключение на него alias movies",
+    )
+    parser.add_argument(
+        "--workers", type=int, default=1, help="число процессов для полной перезагрузки"
+    )
+    parser.add_argument(
+        "--cdc", action="store_true", help="чтение изменений из слота логической репликации"
+    )
+    args = parser.parse_args()
+    if args.cdc:
+        cdc_main()
+    elif args.rebuild:
+        rebuild(args.workers)
+    elif args.full_reindex:
+        full_reindex(args.workers)
+    else:
+        main()
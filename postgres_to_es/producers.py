@@ -0,0 +1,50 @@
+from dataclasses import dataclass
+from typing import FrozenSet, Optional
+
+PERSON_FIELDS = frozenset(
+    {"actors", "directors", "writers", "actors_names", "directors_names", "writers_names"}
+)
+GENRE_FIELDS = frozenset({"genres", "genres_names"})
+
+
+@dataclass(frozen=True)
+class Producer:
+    """Таблица, изменения в которой затрагивают документы кинопроизведений.
+
+    Если в таблице есть ссылка на кинопроизведение, она указывается в film_work_column,
+    иначе затронутые кинопроизведения ищутся через таблицу связей link_table.
+    В fields перечислены поля документа, которые могут измениться из-за этой таблицы
+    (None — весь документ).
+    """
+
+    table: str
+    updated_at_column: str = "updated_at"
+    film_work_column: Optional[str] = None
+    link_table: Optional[str] = None
+    link_column: Optional[str] = None
+    fields: Optional[FrozenSet[str]] = None
+
+
+PRODUCERS = (
+    Producer("film_work", film_work_column="id"),
+    Producer(
+        "person",
+        link_table="person_film_work",
+        link_column="person_id",
+        fields=PERSON_FIELDS,
+    ),
+    Producer(
+        "genre",
+        link_table="genre_film_work",
+        link_column="genre_id",
+        fields=GENRE_FIELDS,
+    ),
+    Producer("person_film_work", film_work_column="film_work_id", fields=PERSON_FIELDS),
+    Producer("genre_film_work", film_work_column="film_work_id", fields=GENRE_FIELDS),
+)
+
+DOCUMENT_PRODUCERS = (
+    Producer("film_work_document", updated_at_column="doc_updated_at", film_work_column="id"),
+)
+
+PRODUCERS_BY_TABLE = {producer.table: producer for producer in PRODUCERS + DOCUMENT_PRODUCERS}
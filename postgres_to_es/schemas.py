@@ -1,4 +1,3 @@
-from datetime import datetime
 from typing import List, Optional
 
 from pydantic import BaseModel, validator
@@ -15,7 +14,6 @@ class FilmWork(BaseModel):
     actors: Optional[List[dict]]
     directors: Optional[List[dict]]
     writers: Optional[List[dict]]
-    update_time: datetime
     writers_names: Optional[str]
     actors_names: Optional[str]
     directors_names: Optional[str]
@@ -36,3 +34,22 @@ class FilmWork(BaseModel):
     @validator("genres_names", always=True)
     def get_genres_names(cls, v, values):
         return v or get_value_by_key("name", values["genres"])
+
+
+def get_document(row) -> dict:
+    """Документ кинопроизведения для elastic search, собранный из строки запроса
+    без валидации pydantic. Совпадает с FilmWork(**row).dict()."""
+    document = dict(row)
+    document["writers_names"] = document.get("writers_names") or get_value_by_key(
+        "full_name", document["writers"]
+    )
+    document["actors_names"] = document.get("actors_names") or get_value_by_key(
+        "full_name", document["actors"]
+    )
+    document["directors_names"] = document.get("directors_names") or get_value_by_key(
+        "full_name", document["directors"]
+    )
+    document["genres_names"] = document.get("genres_names") or get_value_by_key(
+        "name", document["genres"]
+    )
+    return document
@@ -1,40 +1,132 @@
+from psycopg2 import sql
+
+from producers import Producer
+
+
+def get_changes_query(producer: Producer, limit: bool = True) -> sql.Composed:
+    film_work_id = sql.SQL("")
+    if producer.film_work_column:
+        film_work_id = sql.SQL(", {} as film_work_id").format(
+            sql.Identifier(producer.film_work_column)
+        )
+    query = sql.SQL(
+        """
+        select id, {updated_at} as updated_at{film_work_id}
+        from {table}
+        where ({updated_at}, id) > (%s, %s::uuid)
+        order by {updated_at}, id
+    """
+    ).format(
+        updated_at=sql.Identifier(producer.updated_at_column),
+        film_work_id=film_work_id,
+        table=sql.Identifier(producer.table),
+    )
+    if limit:
+        query += sql.SQL("    fetch first %s rows only\n")
+    return query
+
+
+def get_linked_film_works_query(producer: Producer) -> sql.Composed:
+    return sql.SQL(
+        """
+        select distinct film_work_id
+        from {link_table}
+        where {link_column} = any(%s::uuid[])
+    """
+    ).format(
+        link_table=sql.Identifier(producer.link_table),
+        link_column=sql.Identifier(producer.link_column),
+    )
+
+
+def get_tombstones_query() -> str:
+    return """
+        select id, table_name, film_work_id
+        from tombstone
+        order by id
+            fetch first %s rows only
+    """
+
+
+def get_delete_tombstones_query() -> str:
+    return """
+        delete from tombstone
+        where id = any(%s)
+    """
+
+
+def get_film_works_range_query() -> str:
+    return """
+        select id
+        from film_work
+        where id between %s::uuid and %s::uuid
+        order by id
+    """
+
+
 def get_movies_query() -> str:
     return """
-        with persons as (
-            select film_work_id
-                 , jsonb_agg(to_jsonb(p) - 'created_at' - 'updated_at') filter ( where role = 'actor')        actors
-                 , jsonb_agg(to_jsonb(p) - 'created_at' - 'updated_at') filter ( where role = 'producer')     directors
-                 , jsonb_agg(to_jsonb(p) - 'created_at' - 'updated_at') filter ( where role = 'screenwriter') writers
-                 , greatest(max(pfw.updated_at), max(p.updated_at))             persons_updated_at
-            from person_film_work pfw
-                     join person p on pfw.person_id = p.id
-            group by film_work_id
+        with ids as (
+            select unnest(%s::uuid[]) as id
         ),
+             persons as (
+                 select film_work_id
+                      , jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) order by p.full_name) filter ( where role = 'actor')        actors
+                      , jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) order by p.full_name) filter ( where role = 'producer')     directors
+                      , jsonb_agg(jsonb_build_object('id', p.id, 'full_name', p.full_name) order by p.full_name) filter ( where role = 'screenwriter') writers
+                      , string_agg(p.full_name, ', ' order by p.full_name) filter ( where role = 'actor')        actors_names
+                      , string_agg(p.full_name, ', ' order by p.full_name) filter ( where role = 'producer')     directors_names
+                      , string_agg(p.full_name, ', ' order by p.full_name) filter ( where role = 'screenwriter') writers_names
+                 from person_film_work pfw
+                          join person p on pfw.person_id = p.id
+                 where pfw.film_work_id in (select id from ids)
+                 group by film_work_id
+             ),
              genres as (
                  select film_work_id
-                      , jsonb_agg(to_jsonb(g) - 'created_at' - 'updated_at' - 'description')  genres
-                      , greatest(max(fwg.updated_at), max(g.updated_at)) genres_updated_at
+                      , jsonb_agg(jsonb_build_object('id', g.id, 'name', g.name) order by g.name) genres
+                      , string_agg(g.name, ', ' order by g.name)                                  genres_names
                  from genre_film_work fwg
                           join genre g on fwg.genre_id = g.id
+                 where fwg.film_work_id in (select id from ids)
                  group by film_work_id
-             ),
-             res as (
-                 select id
-                      , title
-                      , description
-                      , rating
-                      , g.genres
-                      , p.actors
-                      , p.directors
-                      , p.writers
-                      , greatest(fw.updated_at, p.persons_updated_at, g.genres_updated_at) as update_time
-                 from film_work fw
-                          left join persons p on p.film_work_id = fw.id
-                          left join genres g on g.film_work_id = fw.id
              )
-        select *
-        from res
-        where update_time >= %s
-        order by update_time
-            fetch first %s rows only
+        select fw.id
+             , title
+             , description
+             , rating
+             , g.genres
+             , p.actors
+             , p.directors
+             , p.writers
+             , p.writers_names
+             , p.actors_names
+             , p.directors_names
+             , g.genres_names
+        from film_work fw
+                 join ids on ids.id = fw.id
+                 left join persons p on p.film_work_id = fw.id
+                 left join genres g on g.film_work_id = fw.id
+    """
+
+
+def get_documents_query() -> str:
+    return """
+        select d.*
+        from film_work_document fwd
+           , jsonb_to_record(fwd.document) as d (
+                 id text
+               , title text
+               , description text
+               , rating float
+               , genres jsonb
+               , actors jsonb
+               , directors jsonb
+               , writers jsonb
+               , writers_names text
+               , actors_names text
+               , directors_names text
+               , genres_names text
+             )
+        where fwd.id = any(%s::uuid[])
     """
@@ -0,0 +1,69 @@
+import time
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+from prometheus_client import REGISTRY, Counter, Gauge, Histogram, start_http_server
+
+STAGES = ("extract", "transform", "serialize", "load", "load_wait")
+
+STAGE_SECONDS = Histogram(
+    "etl_stage_seconds",
+    "Время работы стадий ETL",
+    ["stage"],
+    buckets=(0.0001, 0.0005, 0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1, 5, 10, 30),
+)
+EXTRACTED_ROWS = Counter(
+    "etl_extracted_rows", "Изменённые записи, прочитанные из Postgres", ["table"]
+)
+DOCUMENTS = Counter("etl_documents", "Документы, подготовленные для elastic search")
+BULK_BYTES = Histogram(
+    "etl_bulk_payload_bytes",
+    "Размер тела запросов _bulk",
+    buckets=(1024, 16384, 65536, 262144, 1048576, 4194304, 10485760, 52428800),
+)
+BULK_LATENCY = Histogram("etl_bulk_latency_seconds", "Время ответа elastic search на _bulk")
+ES_ITEM_ERRORS = Counter(
+    "etl_es_item_errors", "Документы, не принятые elastic search", ["status"]
+)
+BACKOFF_RETRIES = Counter("etl_backoff_retries", "Повторы после ошибок подключения", ["function"])
+WATERMARK_LAG = Gauge(
+    "etl_watermark_lag_seconds",
+    "Отставание последней загруженной записи таблицы от текущего времени",
+    ["table"],
+)
+
+
+@contextmanager
+def measure(stage):
+    """Добавляет время выполнения блока в гистограмму стадии stage."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        STAGE_SECONDS.labels(stage).observe(time.perf_counter() - start)
+
+
+def set_lag(table, updated_at=None):
+    """Отставание таблицы по времени изменения последней загруженной записи,
+    None — изменений нет, таблица догнана."""
+    lag = 0 if updated_at is None else (datetime.now(timezone.utc) - updated_at).total_seconds()
+    WATERMARK_LAG.labels(table).set(lag)
+
+
+def start_exporter(port, addr="127.0.0.1"):
+    """Запускает в фоне HTTP-сервер с метриками на /metrics."""
+    start_http_server(port, addr)
+
+
+def snapshot():
+    """Суммарные значения метрик, по разнице которых считается пропускная способность."""
+
+    def value(name, labels=None):
+        return REGISTRY.get_sample_value(name, labels or {}) or 0
+
+    return {
+        "seconds": {stage: value("etl_stage_seconds_sum", {"stage": stage}) for stage in STAGES},
+        "documents": value("etl_documents_total"),
+        "bulk_requests": value("etl_bulk_payload_bytes_count"),
+        "bulk_bytes": value("etl_bulk_payload_bytes_sum"),
+    }
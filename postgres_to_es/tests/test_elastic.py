@@ -0,0 +1,96 @@
+import threading
+import time
+
+import pytest
+
+from elastic import ESLoader
+
+
+@pytest.fixture
+def loader():
+    loader = ESLoader(
+        "http://127.0.0.1:9200", "movies", redis_client=None, chunk_size=2, max_in_flight=3
+    )
+    loader.sent = []
+    lock = threading.Lock()
+
+    def bulk(data, offsets):
+        # первые запросы отвечают дольше, чтобы завершиться не по порядку
+        time.sleep(0.05 * max(0, 3 - len(loader.sent)))
+        with lock:
+            loader.sent.append(data)
+
+    loader.bulk = bulk
+    yield loader
+    loader.close()
+
+
+def add(loader, *ids):
+    for id_ in ids:
+        loader.add({"id": id_})
+
+
+def test_after_sent_waits_for_earlier_requests(loader):
+    confirmed = []
+    add(loader, "1", "2", "3")
+    loader.after_sent(lambda: confirmed.append(("first", len(loader.sent))))
+    add(loader, "4", "5")
+    loader.after_sent(lambda: confirmed.append(("second", len(loader.sent))))
+    assert confirmed == []
+    loader.flush()
+    assert [name for name, _ in confirmed] == ["first", "second"]
+    # пачка "first" заканчивается во втором запросе, "second" — в третьем
+    assert confirmed[0][1] >= 2
+    assert confirmed[1][1] == 3
+
+
+def test_after_sent_without_pending_documents_runs_immediately(loader):
+    confirmed = []
+    loader.after_sent(lambda: confirmed.append(True))
+    assert confirmed == [True]
+
+
+def test_after_sent_with_empty_buffer_waits_for_last_request(loader):
+    confirmed = []
+    add(loader, "1", "2", "3")
+    loader.submit()
+    loader.after_sent(lambda: confirmed.append(len(loader.sent)))
+    assert confirmed == []
+    loader.flush()
+    assert confirmed == [2]
+
+
+class BulkResponse:
+    status_code = 200
+    ok = True
+
+    def __init__(self, items):
+        self.items = items
+
+    def json(self):
+        return {"errors": True, "items": self.items}
+
+
+def test_update_of_missing_document_is_not_dead_lettered():
+    loader = ESLoader("http://127.0.0.1:9200", "movies", redis_client=None)
+    failed = []
+    loader.dead_letter = failed.extend
+    loader._post = lambda data: BulkResponse(
+        [
+            {
+                "update": {
+                    "_id": "1",
+                    "status": 404,
+                    "error": {"type": "document_missing_exception"},
+                }
+            },
+            {"index": {"_id": "2", "status": 400, "error": {"type": "mapper_parsing_exception"}}},
+        ]
+    )
+    try:
+        loader.add({"id": "1", "title": "Фильм"}, fields={"title"})
+        loader.add({"id": "2", "title": "Фильм"})
+        loader._bulk(bytes(loader.buffer.data), list(loader.buffer.offsets))
+    finally:
+        loader.close()
+    assert [status for _, status, _ in failed] == [400]
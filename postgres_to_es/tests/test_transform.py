@@ -0,0 +1,74 @@
+import pytest
+
+from elastic import ESLoader
+from schemas import FilmWork, get_document
+
+ACTORS = [
+    {"id": "a1", "full_name": "Анна Иванова"},
+    {"id": "a2", "full_name": "Борис Петров"},
+]
+DIRECTORS = [{"id": "d1", "full_name": "Вера Сидорова"}]
+GENRES = [{"id": "g1", "name": "Драма"}, {"id": "g2", "name": "Комедия"}]
+
+
+def make_row(**values):
+    row = {
+        "id": "2b4e4e0b-8a1e-4c3f-9d9b-1f1e2a3b4c5d",
+        "title": "Фильм",
+        "description": "Описание",
+        "rating": 7.5,
+        "genres": GENRES,
+        "actors": ACTORS,
+        "directors": DIRECTORS,
+        "writers": None,
+        "writers_names": None,
+        "actors_names": None,
+        "directors_names": None,
+        "genres_names": None,
+    }
+    row.update(values)
+    return row
+
+
+ROWS = {
+    "null lists": make_row(genres=None, actors=None, directors=None, writers=None),
+    "empty lists": make_row(genres=[], actors=[], directors=[], writers=[]),
+    "names from lists": make_row(),
+    "names from sql": make_row(
+        actors_names="Анна Иванова, Борис Петров",
+        directors_names="Вера Сидорова",
+        genres_names="Драма, Комедия",
+    ),
+    "empty sql names": make_row(actors_names="", genres_names=""),
+    "null optional fields": make_row(description=None, rating=None),
+}
+
+
+@pytest.fixture
+def loader():
+    loader = ESLoader("http://127.0.0.1:9200", "movies", redis_client=None)
+    yield loader
+    loader.close()
+
+
+@pytest.mark.parametrize("row", ROWS.values(), ids=ROWS.keys())
+def test_fast_transform_matches_pydantic(row):
+    expected = FilmWork(**row).dict()
+    document = get_document(row)
+    assert document == expected
+    assert list(document) == list(expected)
+
+
+@pytest.mark.parametrize("row", ROWS.values(), ids=ROWS.keys())
+@pytest.mark.parametrize("fields", [None, frozenset({"actors", "actors_names"})])
+def test_fast_transform_serializes_identically(loader, row, fields):
+    assert loader._render(get_document(row), fields) == loader._render(
+        FilmWork(**row).dict(), fields
+    )
+
+
+def test_names_from_lists():
+    document = get_document(make_row())
+    assert document["actors_names"] == "Анна Иванова, Борис Петров"
+    assert document["genres_names"] == "Драма, Комедия"
+    assert document["writers_names"] is None
@@ -1,9 +1,17 @@
+import json
 import time
+import uuid
 from datetime import datetime
 from functools import wraps
 from operator import itemgetter
 
+from redis.exceptions import WatchError
+
 from loggers import logger
+from stats import BACKOFF_RETRIES
+
+MIN_UUID = "00000000-0000-0000-0000-000000000000"
+JOURNAL_VERSION = 1
 
 
 def expo(base: float, factor: int, max_value: float):
@@ -27,6 +35,7 @@ def backoff(exp, start_sleep_time=2, factor=2, border_sleep_time=10):
                 try:
                     return func(*args, **kwargs)
                 except exp:
+                    BACKOFF_RETRIES.labels(func.__name__).inc()
                     time.sleep(delay)
                     delay = next(exp_gen)
                     logger.error(
@@ -55,6 +64,109 @@ def get_value_by_key(key, data):
     return names if names else None
 
 
-def get_update_time(redis_client):
-    update_time = redis_client.get("update_time")
-    return datetime.fromisoformat(update_time.decode("utf-8")) if update_time else datetime.min
+def get_position(redis_client, name):
+    updated_at, row_id = redis_client.hmget(f"position:{name}", "updated_at", "id")
+    return (
+        datetime.fromisoformat(updated_at.decode("utf-8")) if updated_at else datetime.min,
+        row_id.decode("utf-8") if row_id else MIN_UUID,
+    )
+
+
+def set_position(redis_client, name, updated_at, row_id):
+    redis_client.hset(
+        f"position:{name}", mapping={"updated_at": updated_at.isoformat(), "id": row_id}
+    )
+
+
+def get_generation(redis_client):
+    """Номер сброса позиций, увеличивается в reset_positions."""
+    return int(redis_client.get("positions_generation") or 0)
+
+
+def write_positions(redis_client, generation, write):
+    """Выполняет write(pipe) в транзакции Redis, если позиции не сбрасывались
+    с момента чтения generation. Возвращает False, если сбрасывались."""
+    with redis_client.pipeline() as pipe:
+        try:
+            pipe.watch("positions_generation")
+            if get_generation(pipe) != generation:
+                return False
+            pipe.multi()
+            write(pipe)
+            pipe.execute()
+        except WatchError:
+            return False
+    return True
+
+
+def save_journal(redis_client, name, position, film_work_ids):
+    updated_at, row_id = position
+    journal = {
+        "v": JOURNAL_VERSION,
+        "table": name,
+        "position": [updated_at.isoformat(), row_id],
+        "ids": film_work_ids,
+    }
+    redis_client.set("journal", json.dumps(journal, separators=(",", ":")))
+
+
+def get_journal(redis_client):
+    """Возвращает таблицу, позицию и id кинопроизведений незавершённой пачки."""
+    data = redis_client.get("journal")
+    if not data:
+        return None
+    journal = json.loads(data)
+    if journal.get("v") != JOURNAL_VERSION:
+        logger.error("Неизвестная версия журнала %s, журнал пропущен", journal.get("v"))
+        return None
+    updated_at, row_id = journal["position"]
+    return journal["table"], (datetime.fromisoformat(updated_at), row_id), journal["ids"]
+
+
+def clear_journal(redis_client):
+    redis_client.delete("journal")
+
+
+def start_tombstone_capture(redis_client):
+    """Начинает сохранять удаления, обработанные во время полной загрузки,
+    чтобы повторить их в новом индексе после её окончания."""
+    redis_client.delete("rebuild_tombstones")
+    redis_client.set("capture_tombstones", 1)
+
+
+def stop_tombstone_capture(redis_client):
+    redis_client.delete("capture_tombstones")
+
+
+def capture_tombstones(redis_client, rows):
+    if not rows or not redis_client.exists("capture_tombstones"):
+        return
+    redis_client.rpush(
+        "rebuild_tombstones",
+        *(
+            json.dumps({"table_name": row["table_name"], "film_work_id": row["film_work_id"]})
+            for row in rows
+        ),
+    )
+
+
+def get_captured_tombstones(redis_client, limit):
+    return [json.loads(row) for row in redis_client.lrange("rebuild_tombstones", 0, limit - 1)]
+
+
+def remove_captured_tombstones(redis_client, count):
+    redis_client.ltrim("rebuild_tombstones", count, -1)
+
+
+def chunks(items, size):
+    for i in range(0, len(items), size):
+        yield items[i : i + size]
+
+
+def get_uuid_partitions(count):
+    """Делит пространство uuid на count диапазонов [first_id, last_id]."""
+    step = 2 ** 128 // count
+    for number in range(count):
+        first = number * step
+        last = 2 ** 128 - 1 if number == count - 1 else first + step - 1
+        yield number, str(uuid.UUID(int=first)), str(uuid.UUID(int=last))